@@ -1,27 +1,13 @@
 import arcpy as ap
-import pandas as pd
-import tempfile
-from collections import OrderedDict
 import os
-import requests
-import json
-import re
 
+from acstools.census import acs_search, table_type
+from acstools.geometry import parse_tolerances, suffix, generalized
+from acstools.params import parse_output_fields, add_margins_of_error, unique_fields
+from acstools.preflight import check_fields
+from acstools.runs import scratch_folder, unique_name
+from acstools.schema import field_types, field_mappings
 
-# Define variables for incoming parameter values
-
-Year = ap.GetParameterAsText(0) # Year (string): 2012-2018. Used if 'All fields' is selected in Select_Fields
-Geography = ap.GetParameterAsText(1) # Census geography: county, tract, or block group
-Counties = ap.GetParameterAsText(2) # Semicolon-delimited string containing either counties of interest, or 'All counties'
-
-ACS_Table = ap.GetParameterAsText(5) # Input Table ID, used if entire table is exported ('All fields')
-Output_Data = ap.GetParameterAsText(6) # Output feature class containing select population estimates for the designated geography
-Select_Fields = ap.GetParameterAsText(7) # Indicates whether all fields from ACS_Table will be exported, or selected fields from one or more tables
-
-Output_Fields = ap.GetParameterAsText(9) # Semicolon-delimited string containing pairs of field IDs and aliases for each selected output field
-Margin_of_Error = ap.GetParameterAsText(10) # Checkbox indicating whether or not to include margins of error in the output table
-
-Output_Fields = Output_Fields.split(";") # Converts Output_Fields from a string to a list
 
 county_list = [[1, 'Anderson'], [3, 'Bedford'], [5, 'Benton'], [7, 'Bledsoe'], [9, 'Blount'], 
             [11, 'Bradley'], [13, 'Campbell'], [15, 'Cannon'], [17, 'Carroll'], [19, 'Carter'], 
@@ -44,204 +30,6 @@ county_list = [[1, 'Anderson'], [3, 'Bedford'], [5, 'Benton'], [7, 'Bledsoe'], [
             [181, 'Wayne'], [183, 'Weakley'], [185, 'White'], [187, 'Williamson'], [189, 'Wilson']]
 
 
-if Counties != "'All counties'": # Counties are converted to a list as well if specific counties are selected
-
-    Counties = Counties.split(";")
-    Counties = [c[0] for c in county_list if c[1] in Counties]
-
-class censusgeo:
-    """Class for representing Census geographies.
-
-    Args:
-        geo (tuple of 2-tuples of strings): Tuple of 2-tuples of the form (geographic component, identifier), where geographic component is a string (e.g., 'state') and
-            identifier is either a numeric code (e.g., '01') or a wildcard ('*'). These identify the geography in question.
-        name (str, optional): Name of geography (e.g., 'Alabama').
-
-    """
-
-    #: dict: Census summary level codes for different types of geography
-    sumleveldict = {
-        'state': '040',
-        'state> county': '050',
-        'state> county> tract': '140',
-        'state> county> tract> block group': '150'
-    }
-
-    def __init__(self, geo, name=''):
-        self.geo = tuple(geo)
-        self.name = name
-
-
-    def __str__(self):
-        if self.name == '':
-            return 'Summary level: ' + self.sumlevel() + ', ' + '> '.join([geo[0]+':'+geo[1] for geo in self.geo])
-        else:
-            return self.name + ': Summary level: ' + self.sumlevel() + ', ' + '> '.join([geo[0]+':'+geo[1] for geo in self.geo])
-
-    def hierarchy(self):
-        """Geography hierarchy for the geographic level of this object.
-
-        Returns:
-            str: String representing the geography hierarchy (e.g., 'state> county')."""
-        return '> '.join([geo[0] for geo in self.geo])
-
-    def sumlevel(self):
-        """Summary level code for the geographic level of this object.
-
-        Returns:
-            str: String representing the summary level code for this object's geographic level, e.g., '050' for 'state> county'."""
-        return self.sumleveldict.get(self.hierarchy(), 'unknown')
-
-    def request(self):
-        """Generate geographic parameters for Census API request.
-
-        Returns:
-            dict: Dictionary with appropriate 'for' and, if needed, 'in' parameters for Census API request."""
-        nospacegeo = [(geo[0].replace(' ', '+'), geo[1]) for geo in self.geo]
-        if len(nospacegeo) > 1:
-            result = {'for': ':'.join(nospacegeo[-1]),
-            'in': '+'.join([':'.join(geo) for geo in nospacegeo[:-1]])}
-        else:
-            result = {'for': ':'.join(nospacegeo[0])}
-        return result
-
-
-def geographies(within, year, key=None):
-    """List geographies within a given geography, e.g., counties within a state.
-
-    Args:
-        within (censusgeo): Geography within which to list geographies.
-        src (str): Census data source: 'acs1' for ACS 1-year estimates, 'acs5' for ACS 5-year estimates, 'acs3' for
-            ACS 3-year estimates, 'acsse' for ACS 1-year supplemental estimates, 'sf1' for SF1 data.
-        year (int): Year of data.
-        key (str, optional): Census API key.
-        endpt (str, optional): Allows override of whether old or new API endpoint is used. Specify
-            'old' for old, 'new' for new, '' to use default. This option generally shouldn't
-            need to be specified but can be helpful if download problems are encountered.
-
-    Returns:
-        dict: Dictionary with names as keys and `censusgeo` objects as values.
-
-    Examples::
-
-        # Pull data on all state geographies from the ACS 2011-2015 5-year estimates.
-        censusdata.geographies(censusdata.censusgeo([('state', '*')]), 'acs5', 2015)
-    """
-    georequest = within.request()
-    params = {'get': 'NAME'}
-    params.update(georequest)
-    if key is not None: params.update({'key': key})
-    geo = _download(year, params)
-    name = geo['NAME']
-    del geo['NAME']
-    return {name[i]: censusgeo([(key, geo[key][i]) for key in geo]) for i in range(len(name))}
-
-def _download(year, params, baseurl = 'https://api.census.gov/data/'):
-
-    """Request data from Census API. Returns data in ordered dictionary. Called by `geographies()` and `download()`.
-
-	Args:
-
-		year (int): Year of data.
-		params (dict): Download parameters.
-		baseurl (str, optional): Base URL for download.
-
-    """
-
-    url = baseurl + str(year) + '/acs/acs5?' + '&'.join('='.join(param) for param in params.items())
-    r = requests.get(url)
-
-    try:
-        data = r.json()
-    except:
-        raise ValueError('Unexpected response (URL: {0.url}): {0.text} '.format(r))
-    rdata = OrderedDict()
-    for j in range(len(data[0])):
-        rdata[data[0][j]] = [data[i][j] for i in range(1, len(data))]
-    return rdata
-
-def download(year, geo, var, key=None):
-    """Download data from Census API.
-
-	Args:
-
-		year (int): Year of data.
-		geo (censusgeo): Geographies for which to download data.
-		var (list of str): Census variables to download.
-		key (str, optional): Census API key.
-
-
-	Returns:
-		pandas.DataFrame: Data frame with columns corresponding to designated variables, and row index of censusgeo objects representing Census geographies.
-
-
-    """
-	
-
-    georequest = geo.request()
-    data = OrderedDict()
-    chunk_size = 49
-
-    for var_chunk in [var[i:(i+chunk_size)] for i in range(0, len(var), chunk_size)]:
-        params = {'get': ','.join(['NAME']+var_chunk)}
-        params.update(georequest)
-        if key is not None: params.update({'key': key})
-        
-        data.update(_download(year, params))
-    geodata = data.copy()
-    for key in list(geodata.keys()):
-        if key in var:
-            del geodata[key]
-            try:
-                data[key] = [int(d) if d is not None else None for d in data[key]]
-            except ValueError:
-                try:
-                    data[key] = [float(d) if d is not None else None for d in data[key]]
-                except ValueError:
-                    data[key] = [d for d in data[key]]
-        else:
-            del data[key]
-
-    geoindex = [censusgeo([(key, geodata[key][i]) for key in geodata if key != 'NAME'], geodata['NAME'][i]) for i in range(len(geodata['NAME']))]
-    return pd.DataFrame(data, geoindex)
-
-def acs_search(year, field, criterion, tabletype='detail'):
-    """Search Census variables.
-
-    Args:
-            ACS 3-year estimates, 'acsse' for ACS 1-year supplemental estimates, 'sf1' for SF1 data.
-        year (int): Year of data.
-        field (str): Field in which to search.
-        criterion (str or function): Search criterion. Either string to search for, or a function which will be passed the value of field and return
-            True if a match and False otherwise.
-        tabletype (str, optional): Type of table from which variables are drawn (only applicable to ACS data). Options are 'detail' (detail tables),
-            'subject' (subject tables), 'profile' (data profile tables), 'cprofile' (comparison profile tables).
-
-    Returns:
-        list: List of 3-tuples containing variable names, concepts, and labels matching the search criterion.
-
-    """
-
-    if hasattr(criterion, '__call__'): match = criterion
-    else: match = lambda value: re.search(criterion, value, re.IGNORECASE)
-
-    try:
-        assert tabletype == 'detail' or tabletype == 'subject' or tabletype == 'profile' or tabletype == 'cprofile'
-    except AssertionError:
-        raise ValueError(u'Unknown table type {0}!'.format(tabletype))
-
-
-    json_url = 'https://api.census.gov/data/' + str(year) + '/acs/acs5/variables.json'
-
-    js = requests.get(json_url)
-
-    allvars = js.text
-
-    allvars = json.loads(allvars)['variables']
-
-    return [(k, allvars[k].get('concept'), allvars[k].get('label')) for k in sorted(allvars.keys()) if match(allvars[k].get(field, ''))]
-
-
 def getTNMap():
     
     def searchDir(env):
@@ -269,76 +57,67 @@ def getTNMap():
         return searchDir('PROGRAMDATA')
     else:
         ap.AddMessage('TNMap not found')
-        
-def unique(list1):
 
-    """Returns a list of only unique values from a list with multiple of the same values
-    
-    Args: 
-        list1 (list): input list of values"""
 
-    unique_list = []
+def GetOptionalParameter(index):
+    """Returns the value of an optional tool parameter as text, or an empty string if the toolbox doesn't define the parameter"""
 
-    for x in list1:
+    if ap.GetArgumentCount() > index:
+        return ap.GetParameterAsText(index)
 
-        if x not in unique_list:
+    return ""
 
-            unique_list.append(x)
+        
+def GetGeoArgs(geo):
 
-    return unique_list
+    if geo == "County":
+        geo_arg = []
 
-def DownloadTable(year, fields, counties="'All counties'", geo="County"):
+    elif geo == "Tract":
+        geo_arg = [("tract", "*")]
 
-    """Returns a pandas dataframe containing population estimates from a list of fields, for a certain year and geography
+    elif geo == "Block group":
+        geo_arg = [("block group", "*")]
     
-    Parameters:
-        year (int): input year
-        fields (list): list of field IDs for ACS data
-        counties (list or str): either a list containing either a list of county FIPS numbers or 'All fields'
-        geo (str): Geography: County, Tract, or Block group"""
-        
-
-    def GetGeoArgs(geo):
+    return geo_arg
 
-        if geo == "County":
-            geo_arg = []
 
-        elif geo == "Tract":
-            geo_arg = [("tract", "*")]
+def DownloadTables(years, year_fields, counties="'All counties'", geo="County"):
 
-        elif geo == "Block group":
-            geo_arg = [("block group", "*")]
-        
-        return geo_arg
+    """Returns a list of pandas dataframes, one per year, containing population estimates for a certain geography.
+    The requests for all years are planned together, and sent to the Census API at once.
+    
+    Parameters:
+        years (list): input years
+        year_fields (list): list containing a list of field IDs for each year
+        counties (list or str): either a list containing either a list of county FIPS numbers or 'All fields'
+        geo (str): Geography: County, Tract, or Block group"""
 
-    if counties == "'All counties'":
+    from acstools.planner import RequestPlan
 
-        acs_df = download(year,
-        censusgeo([("state", "47"), ("county", "*")] + GetGeoArgs(geo)), ["GEO_ID"] + fields)
+    plan = RequestPlan("47", GetGeoArgs(geo), counties, len(county_list))
 
-    else:
+    for year, fields in zip(years, year_fields):
+        plan.add(year, fields)
 
-        acs_df = pd.DataFrame(columns=["GEO_ID"] + fields)
-        for county in counties:
-            county = str(county).zfill(3)
+    ap.AddMessage(plan.summary())
 
-            county_df = download(
-                year,
-                censusgeo([("state", "47"), ("county", county)] + GetGeoArgs(geo)), ["GEO_ID"] + fields)
-            acs_df = acs_df.append(county_df)
+    frames = plan.execute()
 
-    idx_vals = acs_df.index.tolist()
+    return [frames[int(year)][["GEO_ID"] + fields].copy() for year, fields in zip(years, year_fields)]
 
-    idx_list = [str(val).split(",") for val in idx_vals]
 
-    out_counties = []
+def DownloadTable(year, fields, counties="'All counties'", geo="County"):
 
-    for idx in idx_list:
-        for i in idx:
-            if "County" in i:
-                out_counties.append(i)
+    """Returns a pandas dataframe containing population estimates from a list of fields, for a certain year and geography
+    
+    Parameters:
+        year (int): input year
+        fields (list): list of field IDs for ACS data
+        counties (list or str): either a list containing either a list of county FIPS numbers or 'All fields'
+        geo (str): Geography: County, Tract, or Block group"""
 
-    return acs_df
+    return DownloadTables([year], [fields], counties, geo)[0]
     
 def GetFieldList(table, year):
 
@@ -351,8 +130,9 @@ def GetFieldList(table, year):
         
     table = str(table).upper().split(" ")[0]
 
-    cl = acs_search(int(year), 'concept', table)
-    gl = acs_search(int(year), 'group', table)
+    # Subject and profile tables are searched in their own catalogues
+    cl = acs_search(int(year), 'concept', table, table_type(table))
+    gl = acs_search(int(year), 'group', table, table_type(table))
 
     fl = cl + gl
 
@@ -377,163 +157,73 @@ def listToString(sl):
 
     return str1
 
-def GetFieldMappings(in_table, field_list):
-
-    """Returns a field mappings object from an input data table, which can be used to control the order and selection of output data fields
-    
-    Parameters:
-        in_table (string): input table, can either be a spatial data table or standalone
-        field_list (list): list containing paired sets of field names and aliases"""
-        
-
-    fms = ap.FieldMappings()
-    for field in field_list:
-        fmap = ap.FieldMap()
-        fmap.addInputField(in_table, field[0])
-        out_f = fmap.outputField
-        out_f.name = field[0].split(".")[-1]
-        out_f.aliasName = field[1]
-        fmap.outputField = out_f
-        fms.addFieldMap(fmap)
-    return fms
-
-
-def GetOutputTable(acs_table, select_fields, output_fields, year, counties, geo, out_data):
+def GetOutputTable(acs_table, select_fields, output_fields, year, counties, geo, out_data, margin_of_error, tolerances=""):
     """"""
 
-    ap.env.workspace = os.path.dirname(out_data)
-
-    if select_fields == "All fields":
-
-        param_fields = [[f.split(" ")[0], listToString(f.split(" ")[1:])] for f in GetFieldList(acs_table, year)]
-
-        if Margin_of_Error == "true":
-
-            field_list = []
-
-            for field in param_fields:    
-                field_list.append([field[0], field[1]])
-                field_list.append([field[0].replace("E", "M"), "MOE_" + field[1].lstrip("Estimate!!")])    
-
-        else:
-            field_list = param_fields
-
-        out_fields = [f[0] for f in field_list]
-
-        field_list = [[f[0] + "_" + str(year), f[1]] for f in field_list]
+    # Checked first, so an invalid tolerance doesn't fail the run after the download
+    tolerances = parse_tolerances(tolerances)
 
-        out_df = DownloadTable(year, out_fields, counties, geo)
+    # Full paths are used throughout rather than arcpy.env.workspace, which is shared by every run in the process
+    workspace = os.path.dirname(out_data)
 
-        out_df.columns = ["GEO_ID"] + [f + "_" + str(year) for f in out_fields]
-
-        out_df["Geography"] = out_df.index.to_series()
+    if select_fields == "All fields":
 
-        out_df = out_df.set_index("GEO_ID")    
+        year_fields = {year: [[f.split(" ")[0], listToString(f.split(" ")[1:])] for f in GetFieldList(acs_table, year)]}
 
     else:
 
-        # year_list = [f.split(" ")[1] for f in output_fields]
-        year_list = [f.split(" ")[-1] for f in output_fields]
-
-        years = [y.lstrip("(").rstrip(")'") for y in unique(year_list)]
-
-        if len(years) > 1:
-
-            df_list = []
-            field_list = []
-            for year in years:
-
-                # param_fields = [[f.split(" ")[0].lstrip("'"), f.split("' ")[-1].strip("'")] for f in output_fields if year in f.split(" ")[1]]
-                param_fields = [[f.split(" ")[-2].lstrip("'"), f.split(" ")[0].lstrip("'")] for f in output_fields if str(year) in f.split(" ")[-1]]
-
-                if Margin_of_Error == "true":
-
-                    year_fields = []
-
-                    for field in param_fields:
+        year_fields = parse_output_fields(output_fields)
 
-                        year_fields.append([field[0], field[1]])
-                        year_fields.append([field[0].replace("E", "M"), "MOE_" + field[1].lstrip("Estimate!!")])
+    if margin_of_error == "true":
 
-                else:
+        year_fields = {y: add_margins_of_error(fields) for y, fields in year_fields.items()}
 
-                    year_fields = param_fields
+    # A variable selected more than once for a year is downloaded and written once
+    year_fields = {y: unique_fields(fields) for y, fields in year_fields.items()}
 
-                field_list = field_list + [[y[0] + "_" + str(year), y[1]] for y in year_fields]
-                year_fields = [y[0] for y in year_fields]
-                year_df = DownloadTable(int(year), year_fields, counties, geo)
-                year_df.columns = ["GEO_ID"] + [f + "_" + str(year) for f in year_fields]
+    # Fail before downloading anything if a variable doesn't exist in its year
+    check_fields(year_fields)
 
-                df_list.append([year, year_df])
-            
-            
-            df_list[0][1]["Geography"] = df_list[0][1].index.to_series()
-
-            join_df = df_list[0][1].set_index("GEO_ID")
-
-            for df in df_list[1:]:
-
-                df[1] = df[1].set_index("GEO_ID")
-
-                join_df = join_df.join(df[1], how="outer")
-
-            out_df = join_df
-
-        else:
-
-            year = int(years[0])
-
-            # param_fields = [[f.split(" ")[0].lstrip("'"), listToString(f.split(" ")[1:]).split("'")[1]] for f in output_fields if str(year) in f.split(" ")[1]]
-            param_fields = [[f.split(" ")[-2].lstrip("'"), f.split(" ")[0].lstrip("'")] for f in output_fields if str(year) in f.split(" ")[-1]]
+    field_list = [[f[0] + "_" + str(y), f[1]] for y, fields in year_fields.items() for f in fields]
 
+    year_dfs = DownloadTables(list(year_fields), [[f[0] for f in fields] for fields in year_fields.values()], counties, geo)
 
-            if Margin_of_Error == "true":
+    for (year, fields), year_df in zip(year_fields.items(), year_dfs):
+        year_df.columns = ["GEO_ID"] + [f[0] + "_" + str(year) for f in fields]
 
-                field_list = []
+    year_dfs[0]["Geography"] = year_dfs[0].index.to_series()
 
-                for field in param_fields:
+    out_df = year_dfs[0].set_index("GEO_ID")
 
-                    field_list.append([field[0], field[1]])
-                    field_list.append([field[0].replace("E", "M"), "MOE_" + field[1].lstrip("Estimate!!")])
-            
-            else: 
-                
-                field_list = param_fields
-
-            out_fields = [f[0] for f in field_list]
-            field_list = [[f[0] + "_" + str(year), f[1]] for f in field_list]
-
-            out_df = DownloadTable(year, out_fields, counties, geo)
-
-            out_df.columns = ["GEO_ID"] + [f + "_" + str(year) for f in out_fields]
-            out_df["Geography"] = out_df.index.to_series()
-            out_df = out_df.set_index("GEO_ID")
-
-    temp = tempfile.TemporaryDirectory()
+    for year_df in year_dfs[1:]:
 
-    tpath = os.path.dirname(temp.name)
+        out_df = out_df.join(year_df.set_index("GEO_ID"), how="outer")
 
     out_name = os.path.basename(out_data)
 
-    temp_table = os.path.join(tpath, out_name + ".csv")
+    table_name = out_name + "_table"
+
+    out_table = os.path.join(workspace, table_name)
 
     out_df["GEOID"] = out_df.index.to_series()
 
     out_df = out_df.set_index("GEOID")
 
-    out_df.to_csv(temp_table)
+    field_list = [["GEOID", "GEOID"], ["Geography", "Geography"]] + field_list
 
-    out_table = out_name + "_table"
+    # Intermediate files go to a scratch folder private to this run
+    with scratch_folder() as tpath:
 
-    field_list = [["GEOID", "GEOID"], ["Geography", "Geography"]] + field_list
+        temp_table = os.path.join(tpath, out_name + ".csv")
 
-    fmappings = GetFieldMappings(temp_table, field_list)
-    
-    ap.TableToTable_conversion(temp_table, ap.env.workspace, out_table, "", fmappings)
+        out_df.to_csv(temp_table)
 
-    ap.CalculateField_management(out_table, "GEOID", "!GEOID!.split('S')[1]", "PYTHON")
+        # The smallest field type for each column, rather than the types inferred from the CSV
+        fmappings = field_mappings(temp_table, field_list, field_types(out_df))
 
-    os.remove(temp_table)
+        ap.TableToTable_conversion(temp_table, workspace, table_name, "", fmappings)
+
+    ap.CalculateField_management(out_table, "GEOID", "!GEOID!.split('S')[1]", "PYTHON")
 
     def JoinToGeometry(field_list):
 
@@ -564,14 +254,33 @@ def GetOutputTable(acs_table, select_fields, output_fields, year, counties, geo,
             ap.AddField_management(out_table, "CNTY_FIPS", "TEXT")
             ap.CalculateField_management(out_table, "CNTY_FIPS", "str(!GEOID![2:])", "PYTHON")
 
+        field_list = [[table_name + "." + field[0], field[1]] for field in field_list]
+
+        def JoinFeatures(in_fc, name):
+
+            join_lyr = unique_name("join_lyr")
+
+            ap.MakeFeatureLayer_management(in_fc, join_lyr)
 
-        ap.MakeFeatureLayer_management(join_fc, "join_lyr")
+            ap.AddJoin_management(join_lyr, join_fields[0], out_table, join_fields[1], "KEEP_COMMON")
 
-        ap.AddJoin_management("join_lyr", join_fields[0], out_table, join_fields[1], "KEEP_COMMON")
+            fmappings = field_mappings(join_lyr, field_list)
+            ap.FeatureClassToFeatureClass_conversion(join_lyr, workspace, name, "", fmappings)
+
+            ap.Delete_management(join_lyr)
+
+        # The full-resolution output is written first, so a failed generalization never loses it
+        JoinFeatures(join_fc, out_name)
+
+        for tolerance in tolerances:
+
+            # Each tolerance is joined to a cached generalized copy of the boundaries, and reported separately if it fails
+            try:
+                JoinFeatures(generalized(join_fc, tolerance), out_name + suffix(tolerance))
 
-        field_list = [[out_table + "." + field[0], field[1]] for field in field_list]
-        fmappings = GetFieldMappings("join_lyr", field_list)
-        ap.FeatureClassToFeatureClass_conversion("join_lyr", ap.env.workspace, out_name, "", fmappings)
+            except Exception as e:
+
+                ap.AddWarning("Unable to generate feature geometry generalized to {0}: {1}".format(tolerance, e))
 
     try:
         JoinToGeometry(field_list)
@@ -588,4 +297,27 @@ def GetOutputTable(acs_table, select_fields, output_fields, year, counties, geo,
 
         current_map.addDataFromPath(out_data + "_table")
 
-GetOutputTable(ACS_Table, Select_Fields, Output_Fields, int(Year), Counties, Geography, Output_Data)
+if __name__ == "__main__":
+
+    # Define variables for incoming parameter values
+
+    Year = ap.GetParameterAsText(0) # Year (string): 2012-2018. Used if 'All fields' is selected in Select_Fields
+    Geography = ap.GetParameterAsText(1) # Census geography: county, tract, or block group
+    Counties = ap.GetParameterAsText(2) # Semicolon-delimited string containing either counties of interest, or 'All counties'
+
+    ACS_Table = ap.GetParameterAsText(5) # Input Table ID, used if entire table is exported ('All fields')
+    Output_Data = ap.GetParameterAsText(6) # Output feature class containing select population estimates for the designated geography
+    Select_Fields = ap.GetParameterAsText(7) # Indicates whether all fields from ACS_Table will be exported, or selected fields from one or more tables
+
+    Output_Fields = ap.GetParameterAsText(9) # Semicolon-delimited string containing pairs of field IDs and aliases for each selected output field
+    Margin_of_Error = ap.GetParameterAsText(10) # Checkbox indicating whether or not to include margins of error in the output table
+    Tolerances = GetOptionalParameter(11) # Semicolon-delimited generalization tolerances, e.g. 10 Meters;100 Meters
+
+    Output_Fields = Output_Fields.split(";") # Converts Output_Fields from a string to a list
+
+    if Counties != "'All counties'": # Counties are converted to a list as well if specific counties are selected
+
+        Counties = Counties.split(";")
+        Counties = [c[0] for c in county_list if c[1] in Counties]
+
+    GetOutputTable(ACS_Table, Select_Fields, Output_Fields, int(Year), Counties, Geography, Output_Data, Margin_of_Error, Tolerances)
@@ -1,273 +1,125 @@
 import arcpy as ap
-import pandas as pd
-import tempfile
-from collections import OrderedDict
 import os
-import requests
-import json
-import re
 
+from acstools.census import censusgeo, geographies, acs_search, table_type
+from acstools.params import parse_output_fields, add_margins_of_error, unique_fields
+from acstools.preflight import check_fields
+from acstools.derived import parse_derived_fields, derived_columns, derive
+from acstools.streaming import county_partitions, stream_partitions
+from acstools.runs import scratch_folder
+from acstools.schema import field_types, field_mappings
+from acstools.parallel import split_csv, write_partitions
 
-Year = ap.GetParameterAsText(0) # Year (string): 2012-2018.
-State = ap.GetParameterAsText(1) # Select state of interest (name)
-Counties = ap.GetParameterAsText(2) # Semicolon-delimited string containing either counties of interest, or 'All counties'
-Geography = ap.GetParameterAsText(3) # Census geography: county, tract, or block group
 
-ACS_Table = ap.GetParameterAsText(6) # Input Table ID, used if entire table is exported ('All fields')
-Output_Table = ap.GetParameterAsText(7) # Output feature class containing select population estimates for the designated geography
-Select_Fields = ap.GetParameterAsText(8) # Indicates whether all fields from ACS_Table will be exported, or selected fields from one or more tables
-
-Output_Fields = ap.GetParameterAsText(10) # Semicolon-delimited string containing pairs of field IDs and aliases for each selected output field
-Margin_of_Error = ap.GetParameterAsText(11) # Checkbox indicating whether or not to include margins of error in the output table
-
-if Counties != "'All counties'":
-    Counties = Counties.split(";")
-
-ACS_Table = ACS_Table.split(" ")[0]
-Output_Fields = Output_Fields.split(";")
-
-
-class censusgeo:
-    """Class for representing Census geographies.
-
-    Args:
-        geo (tuple of 2-tuples of strings): Tuple of 2-tuples of the form (geographic component, identifier), where geographic component is a string (e.g., 'state') and
-            identifier is either a numeric code (e.g., '01') or a wildcard ('*'). These identify the geography in question.
-        name (str, optional): Name of geography (e.g., 'Alabama').
-
-    """
-
-    #: dict: Census summary level codes for different types of geography
-    sumleveldict = {
-        'state': '040',
-        'state> county': '050',
-        'state> county> tract': '140',
-        'state> county> tract> block group': '150'
-    }
-
-    def __init__(self, geo, name=''):
-        self.geo = tuple(geo)
-        self.name = name
-
-
-    def __str__(self):
-        if self.name == '':
-            return 'Summary level: ' + self.sumlevel() + ', ' + '> '.join([geo[0]+':'+geo[1] for geo in self.geo])
-        else:
-            return self.name + ': Summary level: ' + self.sumlevel() + ', ' + '> '.join([geo[0]+':'+geo[1] for geo in self.geo])
-
-    def hierarchy(self):
-        """Geography hierarchy for the geographic level of this object.
-
-        Returns:
-            str: String representing the geography hierarchy (e.g., 'state> county')."""
-        return '> '.join([geo[0] for geo in self.geo])
-
-    def sumlevel(self):
-        """Summary level code for the geographic level of this object.
-
-        Returns:
-            str: String representing the summary level code for this object's geographic level, e.g., '050' for 'state> county'."""
-        return self.sumleveldict.get(self.hierarchy(), 'unknown')
-
-    def request(self):
-        """Generate geographic parameters for Census API request.
-
-        Returns:
-            dict: Dictionary with appropriate 'for' and, if needed, 'in' parameters for Census API request."""
-        nospacegeo = [(geo[0].replace(' ', '+'), geo[1]) for geo in self.geo]
-        if len(nospacegeo) > 1:
-            result = {'for': ':'.join(nospacegeo[-1]),
-            'in': '+'.join([':'.join(geo) for geo in nospacegeo[:-1]])}
-        else:
-            result = {'for': ':'.join(nospacegeo[0])}
-        return result
-
-
-def geographies(within, year, key=None):
-    """List geographies within a given geography, e.g., counties within a state.
-
-    Args:
-        within (censusgeo): Geography within which to list geographies.
-        src (str): Census data source: 'acs1' for ACS 1-year estimates, 'acs5' for ACS 5-year estimates, 'acs3' for
-            ACS 3-year estimates, 'acsse' for ACS 1-year supplemental estimates, 'sf1' for SF1 data.
-        year (int): Year of data.
-        key (str, optional): Census API key.
-        endpt (str, optional): Allows override of whether old or new API endpoint is used. Specify
-            'old' for old, 'new' for new, '' to use default. This option generally shouldn't
-            need to be specified but can be helpful if download problems are encountered.
-
-    Returns:
-        dict: Dictionary with names as keys and `censusgeo` objects as values.
-
-    Examples::
-
-        # Pull data on all state geographies from the ACS 2011-2015 5-year estimates.
-        censusdata.geographies(censusdata.censusgeo([('state', '*')]), 'acs5', 2015)
-    """
-    georequest = within.request()
-    params = {'get': 'NAME'}
-    params.update(georequest)
-    if key is not None: params.update({'key': key})
-    geo = _download(year, params)
-    name = geo['NAME']
-    del geo['NAME']
-    return {name[i]: censusgeo([(key, geo[key][i]) for key in geo]) for i in range(len(name))}
-
-def _download(year, params, baseurl = 'https://api.census.gov/data/'):
-
-    """Request data from Census API. Returns data in ordered dictionary. Called by `geographies()` and `download()`.
-
-	Args:
-
-		year (int): Year of data.
-		params (dict): Download parameters.
-		baseurl (str, optional): Base URL for download.
-
-    """
-
-    url = baseurl + str(year) + '/acs/acs5?' + '&'.join('='.join(param) for param in params.items())
-    r = requests.get(url)
-
-    try:
-        data = r.json()
-    except:
-        raise ValueError('Unexpected response (URL: {0.url}): {0.text} '.format(r))
-    rdata = OrderedDict()
-    for j in range(len(data[0])):
-        rdata[data[0][j]] = [data[i][j] for i in range(1, len(data))]
-    return rdata
-
-def download(year, geo, var, key=None):
-    """Download data from Census API.
-
-	Args:
+def listToString(s):  
+    
+    str1 = ""  
 
-		year (int): Year of data.
-		geo (censusgeo): Geographies for which to download data.
-		var (list of str): Census variables to download.
-		key (str, optional): Census API key.
+    for ele in s:  
+        str1 += ele   
 
+    return str1 
 
-	Returns:
-		pandas.DataFrame: Data frame with columns corresponding to designated variables, and row index of censusgeo objects representing Census geographies.
+def GetOptionalParameter(index):
+    """Returns the value of an optional tool parameter as text, or an empty string if the toolbox doesn't define the parameter"""
 
+    if ap.GetArgumentCount() > index:
+        return ap.GetParameterAsText(index)
 
-    """
-	
-
-    georequest = geo.request()
-    data = OrderedDict()
-    chunk_size = 49
-
-    for var_chunk in [var[i:(i+chunk_size)] for i in range(0, len(var), chunk_size)]:
-        params = {'get': ','.join(['NAME']+var_chunk)}
-        params.update(georequest)
-        if key is not None: params.update({'key': key})
-        
-        data.update(_download(year, params))
-
-    geodata = data.copy()
-    for key in list(geodata.keys()):
-        if key in var:
-            del geodata[key]
-            try:
-                data[key] = [int(d) if d is not None else None for d in data[key]]
-            except ValueError:
-                try:
-                    data[key] = [float(d) if d is not None else None for d in data[key]]
-                except ValueError:
-                    data[key] = [d for d in data[key]]
-        else:
-            del data[key]
-    geoindex = [censusgeo([(key, geodata[key][i]) for key in geodata if key != 'NAME'], geodata['NAME'][i]) for i in range(len(geodata['NAME']))]
-    return pd.DataFrame(data, geoindex)
+    return ""
 
-def acs_search(year, field, criterion, tabletype='detail'):
-    """Search Census variables.
 
-    Args:
-            ACS 3-year estimates, 'acsse' for ACS 1-year supplemental estimates, 'sf1' for SF1 data.
-        year (int): Year of data.
-        field (str): Field in which to search.
-        criterion (str or function): Search criterion. Either string to search for, or a function which will be passed the value of field and return
-            True if a match and False otherwise.
-        tabletype (str, optional): Type of table from which variables are drawn (only applicable to ACS data). Options are 'detail' (detail tables),
-            'subject' (subject tables), 'profile' (data profile tables), 'cprofile' (comparison profile tables).
+def GetStateNum(state_name, year):
+    """Returns a state FIPS code for an input state name"""
+    stategeo = geographies(censusgeo([('state', "*")]), int(year))
 
-    Returns:
-        list: List of 3-tuples containing variable names, concepts, and labels matching the search criterion.
+    statenum = str(stategeo[state_name]).split(":")[-1]
 
-    """
+    return statenum
 
-    if hasattr(criterion, '__call__'): match = criterion
-    else: match = lambda value: re.search(criterion, value, re.IGNORECASE)
 
-    try:
-        assert tabletype == 'detail' or tabletype == 'subject' or tabletype == 'profile' or tabletype == 'cprofile'
-    except AssertionError:
-        raise ValueError(u'Unknown table type {0}!'.format(tabletype))
+def GetCountyGeos(state_name, year):
+    """Returns the county geographies of a state, keyed by name (e.g. 'Knox County, Tennessee')"""
 
+    state_num = GetStateNum(state_name, year)
 
-    json_url = 'https://api.census.gov/data/' + str(year) + '/acs/acs5/variables.json'
+    return geographies(censusgeo([('state', state_num), ("County", '*')]), int(year))
 
-    js = requests.get(json_url)
 
-    allvars = js.text
+def GetCountyNums(state_name, counties, year, countygeo=None):
+    """Returns a list of county FIPS codes for a list of counties in a particular state"""
 
-    allvars = json.loads(allvars)['variables']
+    if countygeo is None:
+        countygeo = GetCountyGeos(state_name, year)
+    
+    county_list = [str(countygeo[c.strip("'") + ", " + state_name]).split(":")[-1] for c in counties]
+    
+    return county_list
 
-    return [(k, allvars[k].get('concept'), allvars[k].get('label')) for k in sorted(allvars.keys()) if match(allvars[k].get(field, ''))]
 
+def GetGeoArgs(geo):
+    """generates the general portion of the arguments for each geograpy level"""
+    if geo == "County":
+        geo_arg = []
 
+    elif geo == "Tract":
+        geo_arg = [("tract", "*")]
 
-def listToString(s):  
+    elif geo == "Block group":
+        geo_arg = [("block group", "*")]
     
-    str1 = ""  
+    return geo_arg
 
-    for ele in s:  
-        str1 += ele   
 
-    return str1 
+def DownloadTables(years, state_num, year_fields, counties, geo="County", total_counties=None, geoids=None, survey="acs5"):
 
-def GetStateNum(state_name):
-    """Returns a state FIPS code for an input state name"""
-    stategeo = geographies(censusgeo([('state', "*")]), int(Year))
+    """Returns a list of pandas dataframes, one per year, containing population estimates for a certain geography.
+    The requests for all years are planned together, and sent to the Census API at once.
+    
+    Args:
+        years (list): input years
+        state_num (str): state FIPS number
+        year_fields (list): list containing a list of field IDs for each year
+        counties (list or str): either a list containing either a list of county FIPS numbers or 'All fields'
+        geo (str): Geography: County, Tract, or Block group
+        total_counties (int): number of counties in the state, used to decide whether chosen counties are requested state-wide
+        geoids (list): GEOIDs selected by an area of interest, if any; only those in `counties` are downloaded
+        survey (str): 'acs5' for ACS 5-year estimates, or 'acs1' for ACS 1-year estimates"""
 
-    statenum = str(stategeo[state_name]).split(":")[-1]
+    from acstools.planner import RequestPlan
 
-    return statenum
+    if geoids is not None and counties != "'All counties'":
+        geoids = [g for g in geoids if g[2:5] in counties]
 
+    plan = RequestPlan(state_num, GetGeoArgs(geo), counties, total_counties, survey=survey, geoids=geoids)
 
-def GetCountyNums(state_name, counties):
-    """Returns a list of county FIPS codes for a list of counties in a particular state"""
+    for year, fields in zip(years, year_fields):
+        plan.add(year, fields)
 
-    state_num = GetStateNum(state_name)
-        
-    countygeo = geographies(censusgeo([('state', state_num), ("County", '*')]), int(Year))
-    
-    county_list = [str(countygeo[c.strip("'") + ", " + state_name]).split(":")[-1] for c in counties]
-    
-    return county_list
+    ap.AddMessage(plan.summary())
 
+    frames = plan.execute()
 
-def unique(list1):
+    acs_dfs = []
 
+    for year, fields in zip(years, year_fields):
 
-    """Returns a list of only unique values from a list with multiple of the same values
-    
-    Args: 
-        list1 (list): input list of values"""
+        acs_df = frames[int(year)][["GEO_ID"] + fields].copy()
 
-    unique_list = []
+        if acs_df.empty:
+            ap.AddWarning("No {0} estimates were returned for the selected geographies. ACS 1-year estimates are "
+                          "only published for geographies of 65,000 people or more.".format(year))
 
-    for x in list1:
+        acs_df["Geography"] = acs_df.index.to_series()
 
-        if x not in unique_list:
+        acs_df.rename(columns={"GEO_ID": "GEOID"}, inplace=True)
+        acs_df = acs_df.set_index("GEOID")
+        acs_df.columns = [c + "_" + str(year) for c in acs_df.columns if c not in ["Geography"]] + ["Geography"]
+        out_cols = ["Geography"] + [c for c in acs_df.columns if c not in ["Geography"]]
+        acs_dfs.append(acs_df[out_cols])
 
-            unique_list.append(x)
+    return acs_dfs
 
-    return unique_list
 
 def DownloadTable(year, state_num, fields, counties, geo="County"):
 
@@ -279,49 +131,11 @@ def DownloadTable(year, state_num, fields, counties, geo="County"):
         fields (list): list of field IDs for ACS data
         counties (list or str): either a list containing either a list of county FIPS numbers or 'All fields'
         geo (str): Geography: County, Tract, or Block group"""
-        
-
 
-    def GetGeoArgs(geo):
-        """generates the general portion of the arguments for each geograpy level"""
-        if geo == "County":
-            geo_arg = []
-
-        elif geo == "Tract":
-            geo_arg = [("tract", "*")]
-
-        elif geo == "Block group":
-            geo_arg = [("block group", "*")]
-        
-        return geo_arg
-
-    if counties == "'All counties'":
-
-        acs_df = download(year,
-        censusgeo([("state", state_num), ("county", "*")] + GetGeoArgs(geo)), ["GEO_ID"] + fields)
-
-    else:
-
-        acs_df = pd.DataFrame(columns=["GEO_ID"] + fields)
-        for county in counties:
-            county = str(county).zfill(3)
-
-            county_df = download(
-                year,
-                censusgeo([("state", state_num), ("county", county)] + GetGeoArgs(geo)), ["GEO_ID"] + fields)
-            acs_df = acs_df.append(county_df)
-    
-    acs_df["Geography"] = acs_df.index.to_series()
-
-    acs_df.rename(columns={"GEO_ID": "GEOID"}, inplace=True)
-    acs_df = acs_df.set_index("GEOID")
-    acs_df.columns = [c + "_" + str(year) for c in acs_df.columns if c not in ["Geography"]] + ["Geography"]
-    out_cols = ["Geography"] + [c for c in acs_df.columns if c not in ["Geography"]]
-    acs_df = acs_df[out_cols]
-    return acs_df
+    return DownloadTables([year], state_num, [fields], counties, geo)[0]
     
 
-def GetFieldList(table, year):
+def GetFieldList(table, year, survey="acs5"):
     
     """
     Returns a list of all fields for a particular table ID
@@ -332,8 +146,9 @@ def GetFieldList(table, year):
 
     table = str(table).upper()
 
-    cl = acs_search(year, 'concept', table)
-    gl = acs_search(year, 'group', table)
+    # Subject and profile tables are searched in their own catalogues
+    cl = acs_search(year, 'concept', table, table_type(table), survey)
+    gl = acs_search(year, 'group', table, table_type(table), survey)
 
     fl = cl + gl
 
@@ -344,160 +159,231 @@ def GetFieldList(table, year):
     return field_list
 
 
-def GetFieldMappings(in_table, field_list):
+def JoinYears(year_dfs):
 
-    """Returns a field mappings object from an input data table, which can be used to control the order and selection of output data fields
-    
-    Parameters:
-        in_table (string): input table, can either be a spatial data table or standalone
-        field_list (list): list containing paired sets of field names and aliases"""
-        
-
-    fms = ap.FieldMappings()
-
-    for field in field_list:
-
-        fmap = ap.FieldMap()
-        fmap.addInputField(in_table, field[0])
-        out_f = fmap.outputField
-        out_f.name = field[0]
-        out_f.aliasName = field[1]
-        fmap.outputField = out_f
-        fms.addFieldMap(fmap)
+    """Returns a single data frame joining the per-year data frames from DownloadTables on GEOID
     
-    return fms
+    Args:
+        year_dfs (list): list of pandas dataframes, one per year"""
+
+    out_df = year_dfs[0]
+
+    for year_df in year_dfs[1:]:
 
+        out_df = out_df.join(year_df.drop("Geography", axis=1), how="outer")
 
-def GetOutputTable(acs_table, select_fields, output_fields, year, state, counties, geo, out_table, margin_of_error):
+    return out_df
+
+
+def GetOutputTable(acs_table, select_fields, output_fields, year, state, counties, geo, out_table, margin_of_error, zone_crosswalk="",
+                   source_features="", target_features="", target_field="", interpolate_years="", derived_fields="",
+                   partition_output="", geography_table="", write_workers="", keep_partitions="", area_of_interest="",
+                   boundary_features="", search_distance="", survey="acs5", county_geos=None):
     
     """This function applies the above defined functions, using the input parameter 
         values from the tool as the input values for the function arguemnts"""
     
-    statenum = GetStateNum(State)
+    derived = parse_derived_fields(derived_fields)
+
+    if target_features and not (source_features and target_field):
+        raise ValueError("Source Features and Target ID Field are required to interpolate onto Target Features.")
+
+    statenum = GetStateNum(state, year)
+
+    # The state's counties, already listed by the caller to look up county names
+    if county_geos is None:
+        county_geos = GetCountyGeos(state, year)
+
+    if counties == "'All counties'":
+        total_counties = None
+    else:
+        total_counties = len(county_geos)
 
+    geoids = None
+
+    if area_of_interest:
+
+        # Only the geographies near the study area are downloaded, from the counties containing them
+        from acstools.aoi import geoids_in_area
+
+        geoids = [g for g in geoids_in_area(boundary_features, area_of_interest, search_distance) if g.startswith(statenum)]
+
+        if not geoids:
+            raise ValueError("No features of {0} in {1} are within {2} of the area of interest.".format(
+                boundary_features, state, search_distance or "0 Meters"))
+
+        counties = sorted(set(g[2:5] for g in geoids))
+        total_counties = None
+
+        ap.AddMessage("{0} geographies in {1} counties intersect the area of interest".format(len(geoids), len(counties)))
 
     if select_fields == "All fields":
 
-        param_fields = [[f.split(" ")[0], "".join(f.split(" ")[1:])] for f in GetFieldList(acs_table, year)]
+        year_fields = {year: [[f.split(" ")[0], "".join(f.split(" ")[1:])] for f in GetFieldList(acs_table, year, survey)]}
 
-        if Margin_of_Error == "true":
+    else:
 
-            field_list = []
+        year_fields = parse_output_fields(output_fields)
 
-            for field in param_fields:    
-                field_list.append([field[0], field[1]])
-                field_list.append([field[0].replace("E", "M"), "MOE_" + field[1].lstrip("Estimate!!")])    
+    if margin_of_error == "true":
 
-        else:
-            field_list = param_fields
+        year_fields = {y: add_margins_of_error(fields) for y, fields in year_fields.items()}
+
+    # A variable selected more than once for a year is downloaded and written once
+    year_fields = {y: unique_fields(fields) for y, fields in year_fields.items()}
+
+    # Fail before downloading anything if a variable doesn't exist in its year
+    check_fields(year_fields, survey=survey)
+
+    field_list = [[f[0] + "_" + str(y), f[1]] for y, fields in year_fields.items() for f in fields]
 
-        out_fields = [f[0] for f in field_list]
+    download_fields = [[f[0] for f in fields] for fields in year_fields.values()]
 
-        field_list = [[f[0] + "_" + str(year), f[1]] for f in field_list]
+    id_fields = [["GEOID", "GEOID"], ["Geography", "Geography"]]
 
-        out_df = DownloadTable(year, statenum, out_fields, counties, geo)
+    if partition_output == "true" and not (zone_crosswalk or target_features):
 
-        out_df.columns = ["Geography"] + [f + "_" + str(year) for f in out_fields]
+        # Download, join and write one county at a time, so memory use doesn't grow with the output
+        if counties == "'All counties'":
+            counties = [str(g).split(":")[-1] for g in county_geos.values()]
+
+        field_list += derived_columns(derived, margin_of_error == "true")
+
+        out_df = None
 
     else:
 
-        year_list = [f.split(" ")[-1] for f in output_fields]
+        year_dfs = DownloadTables(list(year_fields), statenum, download_fields, counties, geo, total_counties, geoids, survey)
+
+        if target_features:
 
+            from acstools.interpolation import overlay_weights, interpolate
+            from acstools.zones import normalize_geoid
 
-        years = [y.lstrip("(").rstrip(")'") for y in unique(year_list)]
+            weights = overlay_weights(source_features, target_features, target_field)
 
-        if len(years) > 1:
+            interp_years = [int(y) for y in interpolate_years.split(";")] if interpolate_years else list(year_fields)
 
-            df_list = []
-            field_list = []
-            for year in years:
-                param_fields = [[f.split(" ")[-2].lstrip("'"), f.split(" ")[0].lstrip("'")] for f in output_fields if str(year) in f.split(" ")[-1]]
+            year_dfs = [interpolate(df, weights) if int(y) in interp_years else df.set_index(df.index.map(normalize_geoid))
+                        for y, df in zip(year_fields, year_dfs)]
 
-                if Margin_of_Error == "true":
+        out_df = JoinYears(year_dfs)
 
-                    year_fields = []
+        if zone_crosswalk:
 
-                    for field in param_fields:
+            from acstools.zones import ZoneWeights
 
-                        year_fields.append([field[0], field[1]])
-                        year_fields.append([field[0].replace("E", "M"), "MOE_" + field[1].lstrip("Estimate!!")])
+            out_df = ZoneWeights.from_table(zone_crosswalk).aggregate(out_df)
 
-                else:
+            id_fields = [["ZONE", "ZONE"]]
 
-                    year_fields = param_fields
+        if derived:
 
-                field_list = field_list + [[y[0] + "_" + str(year), y[1]] for y in year_fields]
-                year_fields = [y[0] for y in year_fields]
-                year_df = DownloadTable(int(year), statenum, year_fields, counties, geo)
-                year_df.columns = ["Geography"] + [f + "_" + str(year) for f in year_fields]
+            out_df = derive(out_df, derived)
 
-                df_list.append([year, year_df])
+            field_list += [f for f in derived_columns(derived) if f[0] in out_df.columns]
 
-            join_df = df_list[0][1]
 
-            for df in df_list[1:]:
+    # Intermediate files go to a scratch folder private to this run
+    with scratch_folder() as tpath:
 
-                join_df = join_df.join(df[1].drop("Geography", axis=1), how="outer")
-            out_df = join_df
+        if out_table.endswith(".csv"):
+
+            csv_table = out_table
 
         else:
 
-            year = int(years[0])
+            out_name = os.path.basename(out_table)
+
+            csv_table = os.path.join(tpath, out_name + ".csv")
 
+        if out_df is None:
 
-            param_fields = [[f.split(" ")[-2].lstrip("'"), f.split(" ")[0].lstrip("'")] for f in output_fields if str(year) in f.split(" ")[-1]]
+            stream_partitions(county_partitions(counties),
+                              lambda part: derive(JoinYears(DownloadTables(list(year_fields), statenum, download_fields, part, geo, geoids=geoids, survey=survey)), derived),
+                              csv_table, ["Geography"] + [f[0] for f in field_list], ap.AddMessage)
 
-            if Margin_of_Error == "true":
+        else:
 
-                field_list = []
+            out_df.to_csv(csv_table)
 
-                for field in param_fields:
+        if not out_table.endswith(".csv"):
 
-                    field_list.append([field[0], field[1]])
-                    field_list.append([field[0].replace("E", "M"), "MOE_" + field[1].lstrip("Estimate!!")])
-            
-            else: 
-                
-                field_list = param_fields
+            # The smallest field type for each column, rather than the types inferred from the CSV
+            types = field_types(out_df, [f[0] for f in field_list], survey)
 
-            out_fields = [f[0] for f in field_list]
+            if geography_table == "true" and ["Geography", "Geography"] in id_fields:
 
-            field_list = [[f[0] + "_" + str(year), f[1]] for f in field_list]
-            
-            out_df = DownloadTable(year, statenum, out_fields, counties, geo)
+                # Geography names are written once to a lookup table, joinable on GEOID, rather than with every output
+                id_fields = [f for f in id_fields if f[0] != "Geography"]
 
-            out_df.columns = ["Geography"] + [f + "_" + str(year) for f in out_fields]
+                lookup_fields = [["GEOID", "GEOID"], ["Geography", "Geography"]]
 
+                ap.TableToTable_conversion(csv_table, os.path.dirname(out_table), out_name + "_geography", "",
+                                           field_mappings(csv_table, lookup_fields, types))
 
-    if out_table.endswith(".csv"):
+                ap.CalculateField_management(out_table + "_geography", "GEOID", "!GEOID!.split('US')[-1]", "PYTHON")
 
-        out_df.to_csv(out_table)
+            if write_workers and int(write_workers) > 1 and not (zone_crosswalk or target_features):
 
-    else:
+                # Counties are written by parallel worker processes, with the field types of the whole output so they can be appended to it
+                write_partitions(split_csv(csv_table, tpath), out_table, id_fields + field_list, types, int(write_workers),
+                                 keep_partitions != "true", message=ap.AddMessage)
 
-        temp = tempfile.TemporaryDirectory()
+            else:
 
-        tpath = os.path.dirname(temp.name)
+                fmappings = field_mappings(csv_table, id_fields + field_list, types)
 
-        out_name = os.path.basename(out_table)
+                ap.TableToTable_conversion(csv_table, os.path.dirname(out_table), out_name, "", fmappings)
 
-        temp_table = os.path.join(tpath, out_name + ".csv")
+                if not zone_crosswalk:
+                    ap.CalculateField_management(out_table, "GEOID", "!GEOID!.split('US')[-1]", "PYTHON")
 
-        out_df.to_csv(temp_table)
+if __name__ == "__main__":
 
-        fmappings = GetFieldMappings(temp_table, [["GEOID", "GEOID"], ["Geography", "Geography"]] + field_list)
+    Year = ap.GetParameterAsText(0) # Year (string): 2012-2018.
+    State = ap.GetParameterAsText(1) # Select state of interest (name)
+    Counties = ap.GetParameterAsText(2) # Semicolon-delimited string containing either counties of interest, or 'All counties'
+    Geography = ap.GetParameterAsText(3) # Census geography: county, tract, or block group
 
-        ap.TableToTable_conversion(temp_table, os.path.dirname(out_table), out_name, "", fmappings)
+    ACS_Table = ap.GetParameterAsText(6) # Input Table ID, used if entire table is exported ('All fields')
+    Output_Table = ap.GetParameterAsText(7) # Output feature class containing select population estimates for the designated geography
+    Select_Fields = ap.GetParameterAsText(8) # Indicates whether all fields from ACS_Table will be exported, or selected fields from one or more tables
 
-        ap.CalculateField_management(out_table, "GEOID", "!GEOID!.split('S')[1]", "PYTHON")
+    Output_Fields = ap.GetParameterAsText(10) # Semicolon-delimited string containing pairs of field IDs and aliases for each selected output field
+    Margin_of_Error = ap.GetParameterAsText(11) # Checkbox indicating whether or not to include margins of error in the output table
+    Zone_Crosswalk = GetOptionalParameter(12) # Optional table of GEOID, ZONE and WEIGHT fields used to aggregate estimates to planning zones
+    Source_Features = GetOptionalParameter(13) # Optional boundaries matching the downloaded geography (e.g. 2010 tracts), for interpolation
+    Target_Features = GetOptionalParameter(14) # Optional polygons to interpolate estimates onto (e.g. 2020 tracts)
+    Target_ID_Field = GetOptionalParameter(15) # ID field of Target_Features
+    Interpolate_Years = GetOptionalParameter(16) # Semicolon-delimited years to interpolate; all years if empty
+    Derived_Fields = GetOptionalParameter(17) # Semicolon-delimited formulas, e.g. SHARE = percent(B08301_010E_2019, B08301_001E_2019)
+    Partition_Output = GetOptionalParameter(18) # Checkbox indicating whether to download and write the output one county at a time
+    Geography_Table = GetOptionalParameter(19) # Checkbox indicating whether to write Geography names to a separate lookup table
+    Write_Workers = GetOptionalParameter(20) # Number of worker processes writing counties in parallel; written in one step if empty or 1
+    Keep_Partitions = GetOptionalParameter(21) # Checkbox indicating whether to keep one table per county instead of merging them
+    Area_of_Interest = GetOptionalParameter(22) # Optional study area features; only geographies intersecting them are downloaded
+    Boundary_Features = GetOptionalParameter(23) # Boundaries of the output geography (e.g. TIGER/Line tracts), used with Area_of_Interest
+    Search_Distance = GetOptionalParameter(24) # Optional distance around Area_of_Interest, e.g. 500 Meters
+    Survey = GetOptionalParameter(25) # ACS 5-year (default) or ACS 1-year estimates
 
-        os.remove(temp_table)
+    if Counties != "'All counties'":
+        Counties = Counties.split(";")
 
-if Counties == "'All counties'":
+    ACS_Table = ACS_Table.split(" ")[0]
+    Output_Fields = Output_Fields.split(";")
+    Survey = "acs1" if Survey == "ACS 1-year" else "acs5"
 
-    county_list = Counties
-else:
-    county_list = GetCountyNums(State, Counties)
+    County_Geos = GetCountyGeos(State, Year)
+
+    if Counties == "'All counties'":
+
+        county_list = Counties
+    else:
+        county_list = GetCountyNums(State, Counties, Year, County_Geos)
 
 
-GetOutputTable(ACS_Table, Select_Fields, Output_Fields, int(Year), State, county_list, Geography, Output_Table, Margin_of_Error)
+    GetOutputTable(ACS_Table, Select_Fields, Output_Fields, int(Year), State, county_list, Geography, Output_Table, Margin_of_Error, Zone_Crosswalk,
+                   Source_Features, Target_Features, Target_ID_Field, Interpolate_Years, Derived_Fields,
+                   Partition_Output, Geography_Table, Write_Workers, Keep_Partitions, Area_of_Interest, Boundary_Features,
+                   Search_Distance, Survey, County_Geos)
@@ -0,0 +1,17 @@
+"""Shared modules for the ACS Data Downloader script tools in the Census Data toolbox."""
+
+import hashlib
+import json
+import os
+
+
+#: str: Folder for cached weight matrices and variable catalogues. Set the ACSTOOLS_CACHE environment variable to share a cache.
+CACHE_DIR = os.environ.get('ACSTOOLS_CACHE', os.path.join(os.path.expanduser('~'), '.acstools'))
+
+
+def cache_path(kind, *parts, extension='.npz'):
+    """Returns a file path in the cache folder, named by a hash of the parts identifying its contents."""
+
+    digest = hashlib.sha1(json.dumps([str(p) for p in parts]).encode('utf-8')).hexdigest()
+
+    return os.path.join(CACHE_DIR, kind, digest + extension)
@@ -0,0 +1,154 @@
+"""Selection of the Census geographies intersecting an area of interest.
+
+Corridor and site studies only need the tracts or block groups near a study area, rather than
+whole counties. `geoids_in_area()` finds them in a boundary layer (e.g. TIGER/Line tracts) in
+two steps:
+
+1. a bounding box index of the boundary layer, a GEOID and extent per feature held in numpy
+   arrays, gives the candidates whose extents overlap the (buffered) extent of the area. The
+   index is built once per layer and cached in the `aoi` folder of `CACHE_DIR`;
+2. only the candidates are then tested against the area's geometry with Select Layer By Location.
+
+`RequestPlan` turns the selected GEOIDs into requests for just those tracts (one request per
+county, listing the tracts), or for the block groups of the counties they are in, which are then
+filtered to the selection.
+"""
+
+import os
+
+import numpy as np
+
+from acstools import cache_path
+
+
+#: dict: Meters per linear unit, for search distances such as '500 Meters' or '0.5 Miles'
+METERS = {'meter': 1.0, 'kilometer': 1000.0, 'feet': 0.3048, 'foot': 0.3048, 'ussurveyfeet': 1200 / 3937,
+          'yard': 0.9144, 'mile': 1609.344, 'nauticalmile': 1852.0}
+
+#: float: Approximate meters per degree, used to widen the candidate search for geographic coordinates
+METERS_PER_DEGREE = 111000.0
+
+
+def _meters(search_distance):
+    """Returns a search distance such as '500 Meters' in meters (0 if empty)."""
+
+    if not search_distance:
+        return 0.0
+
+    value, _, unit = str(search_distance).strip().partition(' ')
+    unit = unit.replace(' ', '').replace('_', '').lower().rstrip('s') or 'meter'
+
+    if unit not in METERS:
+        raise ValueError("Unsupported search distance unit: {0}".format(search_distance))
+
+    return float(value) * METERS[unit]
+
+
+class BoundaryIndex:
+    """Bounding box index of a boundary layer.
+
+    Args:
+        geoids (list): GEOIDs of the features.
+        boxes (numpy.ndarray): Feature extents, one (xmin, ymin, xmax, ymax) row per feature.
+
+    """
+
+    def __init__(self, geoids, boxes):
+        self.geoids = np.asarray(geoids, dtype=str)
+        self.boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+
+    @classmethod
+    def from_features(cls, features, geoid_field):
+        """Builds the index of a boundary layer, or loads it from the cache. The cache is keyed by the
+        layer's path, feature count and extent, which are read without scanning the features."""
+
+        import arcpy as ap
+
+        desc = ap.Describe(features)
+        ext = desc.extent
+        path = cache_path('aoi', desc.catalogPath, ap.management.GetCount(features)[0], geoid_field,
+                          ext.XMin, ext.YMin, ext.XMax, ext.YMax, desc.spatialReference.factoryCode)
+
+        if os.path.exists(path):
+            with np.load(path) as f:
+                return cls(f['geoids'], f['boxes'])
+
+        geoids = []
+        boxes = []
+
+        with ap.da.SearchCursor(features, [geoid_field, 'SHAPE@']) as cursor:
+            for geoid, shape in cursor:
+                if shape is not None:
+                    e = shape.extent
+                    geoids.append(str(geoid))
+                    boxes.append((e.XMin, e.YMin, e.XMax, e.YMax))
+
+        index = cls(geoids, boxes)
+        index.save(path)
+
+        return index
+
+    def save(self, path):
+        """Saves the index to a .npz file."""
+
+        from acstools.runs import replace_file, temporary_path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = temporary_path(path)
+        np.savez_compressed(tmp, geoids=self.geoids, boxes=self.boxes)
+        replace_file(tmp, path)
+
+    def candidates(self, xmin, ymin, xmax, ymax):
+        """Returns the GEOIDs of the features whose extents overlap a rectangle."""
+
+        b = self.boxes
+        overlap = (b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin)
+
+        return self.geoids[overlap].tolist()
+
+
+def geoids_in_area(boundaries, aoi, search_distance="", geoid_field=None):
+    """Returns the GEOIDs of the boundary features within a search distance of an area of interest.
+
+    Args:
+        boundaries (str): Boundary layer of the geography to download (e.g. TIGER/Line tracts).
+        aoi (str): Polygon, line or point features of the study area.
+        search_distance (str, optional): Linear unit, e.g. '500 Meters', to buffer the area by.
+        geoid_field (str, optional): GEOID field of `boundaries`. Found automatically if None.
+
+    Returns:
+        list: Sorted GEOIDs (without summary level prefix).
+
+    """
+
+    import arcpy as ap
+    from acstools.layers import ensure_spatial_index, find_geoid_field
+    from acstools.runs import unique_name
+
+    if geoid_field is None:
+        geoid_field = find_geoid_field(boundaries)
+
+    index = BoundaryIndex.from_features(boundaries, geoid_field)
+    sr = ap.Describe(boundaries).spatialReference
+    ext = ap.Describe(aoi).extent.projectAs(sr)
+
+    pad = _meters(search_distance)
+    pad = pad / METERS_PER_DEGREE * 1.5 if sr.type == 'Geographic' else pad / (sr.metersPerUnit or 1.0)
+    candidates = index.candidates(ext.XMin - pad, ext.YMin - pad, ext.XMax + pad, ext.YMax + pad)
+
+    if not candidates:
+        return []
+
+    ensure_spatial_index(boundaries)
+    layer = unique_name('aoi_lyr')
+    field = ap.AddFieldDelimiters(boundaries, geoid_field)
+    where = "{0} IN ({1})".format(field, ", ".join("'{0}'".format(g) for g in candidates))
+
+    ap.management.MakeFeatureLayer(boundaries, layer, where)
+
+    try:
+        ap.management.SelectLayerByLocation(layer, 'INTERSECT', aoi, search_distance or None, 'NEW_SELECTION')
+        with ap.da.SearchCursor(layer, [geoid_field]) as cursor:
+            return sorted(str(row[0]).split('US')[-1] for row in cursor)
+    finally:
+        ap.management.Delete(layer)
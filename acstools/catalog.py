@@ -0,0 +1,211 @@
+"""Cached and indexed ACS variable catalogues for the Census Data toolbox.
+
+Searching for tables and listing fields needs the `variables.json` catalogue for the selected
+year, which is several megabytes. Fetching it in the tool validator blocks the ArcGIS Pro UI,
+so catalogues are instead loaded on a background thread as soon as a year is known, with
+`prefetch_years()`, and held in memory for the rest of the session and on disk (in the
+`catalog` folder of `CACHE_DIR`) between sessions. By the time a Search Key or ACS Table is
+typed the catalogue is usually ready, and `search_tables()` and `field_list()` return at once.
+
+Each ACS dataset (e.g. the 5-year subject tables, `acs/acs5/subject`) has its own catalogue;
+every function takes the dataset, which defaults to the 5-year detail tables.
+`variable_catalog()` returns the catalogue holding a variable, from its table ID.
+
+Usage in a tool validator:
+
+    from acstools import catalog
+
+    def updateParameters(self):
+        year = self.params[0].valueAsText
+        if self.params[0].altered and year:
+            catalog.prefetch_years(year, self.params[10].valueAsText)
+        if self.params[4].altered and self.params[4].valueAsText:
+            self.params[5].filter.list = catalog.search_tables(year, self.params[4].valueAsText)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from acstools import CACHE_DIR, census
+from acstools.params import output_years
+from acstools.runs import replace_file, temporary_path
+
+
+#: int: Years either side of the selected year to prefetch, for multi-year selections
+ADJACENT_YEARS = 1
+
+_executor = ThreadPoolExecutor(2, thread_name_prefix='catalog')
+_futures = {}
+_lock = threading.Lock()
+
+
+class Catalog:
+    """ACS variable catalogue for one year and dataset, indexed by table.
+
+    Args:
+        year (int): Year of data.
+        variables (dict): Variables from `variables.json`, keyed by variable name.
+        dataset (str, optional): Dataset path, e.g. 'acs/acs5/subject'.
+
+    """
+
+    def __init__(self, year, variables, dataset=census.DATASET):
+        self.year = year
+        self.dataset = dataset
+        self.variables = variables
+        self.tables = {}
+
+        for name in sorted(variables):
+            group = variables[name].get('group')
+            if group and group != 'N/A':
+                self.tables.setdefault(group, []).append(name)
+
+    def search(self, field, criterion):
+        """Search variables, like `census.acs_search()`."""
+
+        if hasattr(criterion, '__call__'): match = criterion
+        else: match = lambda value: re.search(criterion, value, re.IGNORECASE)
+
+        return [(k, self.variables[k].get('concept'), self.variables[k].get('label'))
+                for k in sorted(self.variables) if match(self.variables[k].get(field, ''))]
+
+    def search_tables(self, key):
+        """Returns "table ID concept" strings for the tables whose ID or concept matches a search key."""
+
+        out = []
+
+        for group in sorted(self.tables):
+            concept = self.variables[self.tables[group][0]].get('concept') or ''
+            if re.search(key, group + ' ' + concept, re.IGNORECASE):
+                out.append('{0} {1}'.format(group, concept))
+
+        return out
+
+    def field_list(self, table):
+        """Returns "field ID label" strings for the estimate fields of a table, like GetFieldList in the tool scripts.
+        The table may be given as a Search Results value, e.g. 'B01001 SEX BY AGE'."""
+
+        table = str(table).upper().split(" ")[0]
+
+        return ['{0} {1}'.format(k, self.variables[k].get('label')) for k in self.tables.get(table, []) if k[-1] == 'E']
+
+
+def _url(year, dataset=census.DATASET):
+    return census.BASEURL + str(year) + '/' + dataset + '/variables.json'
+
+
+def _load(year, dataset=census.DATASET):
+    """Loads a year's catalogue from the disk cache, or from the Census API (saving it to the cache)."""
+
+    # Cached files are named by URL, so each dataset (and base URL) has its own
+    url = _url(year, dataset)
+    path = os.path.join(CACHE_DIR, 'catalog', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json.gz')
+
+    if os.path.exists(path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return Catalog(year, json.load(f), dataset)
+
+    import requests
+
+    r = requests.get(url)
+    r.raise_for_status()
+    variables = r.json()['variables']
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = temporary_path(path)
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        json.dump(variables, f)
+    replace_file(tmp, path)
+
+    return Catalog(year, variables, dataset)
+
+
+def prefetch(*years, dataset=census.DATASET):
+    """Starts loading the catalogues of a dataset for years that aren't loaded or loading, on a background thread."""
+
+    with _lock:
+        for year in years:
+            key = (int(year), dataset)
+            if key not in _futures:
+                _futures[key] = _executor.submit(_load, key[0], dataset)
+
+
+def prefetch_years(year, output_fields=None, dataset=census.DATASET):
+    """Prefetches the catalogues for the selected year, the years either side of it, and the years
+    already in the Output Fields parameter.
+
+    Args:
+        year (int or str): Selected year.
+        output_fields (str, optional): Value of the Output Fields parameter, with years in brackets.
+        dataset (str, optional): Dataset path, e.g. 'acs/acs5/profile'.
+
+    """
+
+    year = int(year)
+    years = [year] + [y for i in range(1, ADJACENT_YEARS + 1) for y in (year - i, year + i)]
+    years += list(output_years(output_fields))
+
+    prefetch(*years, dataset=dataset)
+
+
+def ready(year, dataset=census.DATASET):
+    """Returns True if a year's catalogue is loaded."""
+
+    future = _futures.get((int(year), dataset))
+
+    return future is not None and future.done() and future.exception() is None
+
+
+def catalog(year, timeout=None, dataset=census.DATASET):
+    """Returns the catalogue of a dataset for a year, waiting for it to load if needed.
+
+    Args:
+        year (int or str): Year of data.
+        timeout (float, optional): Seconds to wait. If None, waits until loaded.
+        dataset (str, optional): Dataset path, e.g. 'acs/acs5/subject'.
+
+    Raises:
+        concurrent.futures.TimeoutError: If the catalogue isn't loaded within `timeout`.
+
+    """
+
+    key = (int(year), dataset)
+    prefetch(key[0], dataset=dataset)
+    future = _futures[key]
+
+    try:
+        return future.result(timeout)
+    except Exception:
+        if future.done():
+            # Forget failed loads (e.g. a dropped connection) so they are tried again
+            with _lock:
+                if _futures.get(key) is future:
+                    del _futures[key]
+        raise
+
+
+def variable_catalog(variable, year, survey='acs5', timeout=None):
+    """Returns the catalogue holding a variable: that of the dataset of its table type (see `census.table_type()`)."""
+
+    return catalog(year, timeout, census.dataset(census.table_type(variable), survey))
+
+
+def search_tables(year, key, timeout=None, dataset=census.DATASET):
+    """Returns the Search Results for a search key: "table ID concept" strings for matching tables."""
+
+    return catalog(year, timeout, dataset).search_tables(key)
+
+
+def field_list(year, table, timeout=None, dataset=None, survey='acs5'):
+    """Returns the Field List for a table: "field ID label" strings for its estimate fields. The dataset
+    defaults to that of the table's type in the survey (e.g. the 5-year subject tables for S0801)."""
+
+    if dataset is None:
+        dataset = census.dataset(census.table_type(table), survey)
+
+    return catalog(year, timeout, dataset).field_list(table)
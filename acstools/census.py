@@ -0,0 +1,302 @@
+"""Census Data API access shared by the ACS Data Downloader script tools.
+
+Adapted from the open-source CensusData package. All requests are made against
+`BASEURL`, which defaults to the public Census API and can be redirected (e.g. to a
+local mock or caching service) with the CENSUS_API_BASEURL environment variable.
+
+Requests go to one of the ACS datasets: the detail, subject, data profile and comparison
+profile tables of the 5-year or 1-year estimates (e.g. `acs/acs5/subject`). `dataset()` returns
+the dataset for a table type and survey, and `table_type()` the table type of a variable from
+its table ID (e.g. 'subject' for S0801_C01_001E), so variables can be routed to their dataset.
+
+pandas and requests are imported when data is first downloaded rather than with the module,
+so the toolbox validator can use `censusgeo` and the catalogue without loading them.
+"""
+
+import os
+from collections import OrderedDict
+
+
+#: str: Base URL for Census API requests
+BASEURL = os.environ.get('CENSUS_API_BASEURL', 'https://api.census.gov/data/')
+
+#: dict: Dataset path suffixes of the ACS table types
+TABLETYPES = OrderedDict([('detail', ''), ('subject', '/subject'), ('profile', '/profile'), ('cprofile', '/cprofile')])
+
+#: tuple: ACS surveys: 5-year and 1-year estimates
+SURVEYS = ('acs5', 'acs1')
+
+#: str: Dataset of the ACS 5-year detail tables, used unless another is given
+DATASET = 'acs/acs5'
+
+
+def dataset(tabletype='detail', survey='acs5'):
+    """Returns the dataset path of an ACS table type and survey, e.g. 'acs/acs1/profile'.
+
+    Args:
+        tabletype (str, optional): 'detail', 'subject', 'profile' or 'cprofile'.
+        survey (str, optional): 'acs5' for 5-year estimates, or 'acs1' for 1-year estimates.
+
+    Raises:
+        ValueError: If the table type or survey is unknown.
+
+    """
+
+    if tabletype not in TABLETYPES:
+        raise ValueError(u'Unknown table type {0}!'.format(tabletype))
+    if survey not in SURVEYS:
+        raise ValueError(u'Unknown survey {0}!'.format(survey))
+
+    return 'acs/' + survey + TABLETYPES[tabletype]
+
+
+def table_type(variable):
+    """Returns the table type of a variable from its table ID prefix: 'subject' (S), 'profile' (DP),
+    'cprofile' (CP), or 'detail' for other variables (B and C tables, NAME and GEO_ID)."""
+
+    name = str(variable).upper()
+
+    if name.startswith('DP'):
+        return 'profile'
+    if name.startswith('CP'):
+        return 'cprofile'
+    if name[:1] == 'S' and name[1:2].isdigit():
+        return 'subject'
+
+    return 'detail'
+
+
+class censusgeo:
+    """Class for representing Census geographies.
+
+    Args:
+        geo (tuple of 2-tuples of strings): Tuple of 2-tuples of the form (geographic component, identifier), where geographic component is a string (e.g., 'state') and
+            identifier is either a numeric code (e.g., '01') or a wildcard ('*'). These identify the geography in question.
+        name (str, optional): Name of geography (e.g., 'Alabama').
+
+    """
+
+    #: dict: Census summary level codes for different types of geography
+    sumleveldict = {
+        'state': '040',
+        'state> county': '050',
+        'state> county> tract': '140',
+        'state> county> tract> block group': '150'
+    }
+
+    def __init__(self, geo, name=''):
+        self.geo = tuple(geo)
+        self.name = name
+
+
+    def __str__(self):
+        if self.name == '':
+            return 'Summary level: ' + self.sumlevel() + ', ' + '> '.join([geo[0]+':'+geo[1] for geo in self.geo])
+        else:
+            return self.name + ': Summary level: ' + self.sumlevel() + ', ' + '> '.join([geo[0]+':'+geo[1] for geo in self.geo])
+
+    def hierarchy(self):
+        """Geography hierarchy for the geographic level of this object.
+
+        Returns:
+            str: String representing the geography hierarchy (e.g., 'state> county')."""
+        return '> '.join([geo[0] for geo in self.geo])
+
+    def sumlevel(self):
+        """Summary level code for the geographic level of this object.
+
+        Returns:
+            str: String representing the summary level code for this object's geographic level, e.g., '050' for 'state> county'."""
+        return self.sumleveldict.get(self.hierarchy(), 'unknown')
+
+    def request(self):
+        """Generate geographic parameters for Census API request.
+
+        Returns:
+            dict: Dictionary with appropriate 'for' and, if needed, 'in' parameters for Census API request."""
+        nospacegeo = [(geo[0].replace(' ', '+'), geo[1]) for geo in self.geo]
+        if len(nospacegeo) > 1:
+            result = {'for': ':'.join(nospacegeo[-1]),
+            'in': '+'.join([':'.join(geo) for geo in nospacegeo[:-1]])}
+        else:
+            result = {'for': ':'.join(nospacegeo[0])}
+        return result
+
+
+def geographies(within, year, key=None, dataset=DATASET):
+    """List geographies within a given geography, e.g., counties within a state.
+
+    Args:
+        within (censusgeo): Geography within which to list geographies.
+        src (str): Census data source: 'acs1' for ACS 1-year estimates, 'acs5' for ACS 5-year estimates, 'acs3' for
+            ACS 3-year estimates, 'acsse' for ACS 1-year supplemental estimates, 'sf1' for SF1 data.
+        year (int): Year of data.
+        key (str, optional): Census API key.
+        dataset (str, optional): Dataset path, e.g. 'acs/acs1' for ACS 1-year estimates.
+
+    Returns:
+        dict: Dictionary with names as keys and `censusgeo` objects as values.
+
+    Examples::
+
+        # Pull data on all state geographies from the ACS 2011-2015 5-year estimates.
+        censusdata.geographies(censusdata.censusgeo([('state', '*')]), 'acs5', 2015)
+    """
+    georequest = within.request()
+    params = {'get': 'NAME'}
+    params.update(georequest)
+    if key is not None: params.update({'key': key})
+    geo = _download(year, params, dataset=dataset)
+    name = geo['NAME']
+    del geo['NAME']
+    return {name[i]: censusgeo([(key, geo[key][i]) for key in geo]) for i in range(len(name))}
+
+def _download(year, params, baseurl=None, dataset=DATASET):
+
+    """Request data from Census API. Returns data in ordered dictionary. Called by `geographies()` and `download()`.
+
+	Args:
+
+		year (int): Year of data.
+		params (dict): Download parameters.
+		baseurl (str, optional): Base URL for download. Defaults to `BASEURL`.
+		dataset (str, optional): Dataset path, e.g. 'acs/acs5/subject'.
+
+    """
+
+    import requests
+
+    return _response(requests.get(_url(year, params, baseurl, dataset)))
+
+def _response(r):
+    """Parse a Census API response into an ordered dictionary of columns, raising ValueError if it isn't a data response.
+    An empty response (HTTP 204, e.g. ACS 1-year data for a county under 65,000 people) gives an empty dictionary."""
+
+    if r.status_code == 204:
+        return OrderedDict()
+
+    try:
+        data = r.json()
+    except:
+        raise ValueError('Unexpected response (URL: {0.url}): {0.text} '.format(r))
+    return _todict(data)
+
+def _url(year, params, baseurl=None, dataset=DATASET):
+    """Build the Census API request URL for a year, dataset and set of download parameters."""
+
+    if baseurl is None: baseurl = BASEURL
+
+    return baseurl + str(year) + '/' + dataset + '?' + '&'.join('='.join(param) for param in params.items())
+
+def _todict(data):
+    """Transpose a Census API response (a header row followed by data rows) into an ordered dictionary of columns."""
+
+    rdata = OrderedDict()
+    for j in range(len(data[0])):
+        rdata[data[0][j]] = [data[i][j] for i in range(1, len(data))]
+    return rdata
+
+def download(year, geo, var, key=None, dataset=DATASET):
+    """Download data from Census API.
+
+	Args:
+
+		year (int): Year of data.
+		geo (censusgeo): Geographies for which to download data.
+		var (list of str): Census variables to download.
+		key (str, optional): Census API key.
+		dataset (str, optional): Dataset path, e.g. 'acs/acs5/profile'.
+
+
+	Returns:
+		pandas.DataFrame: Data frame with columns corresponding to designated variables, and row index of censusgeo objects representing Census geographies.
+
+
+    """
+	
+
+    data = OrderedDict()
+
+    for params in _chunks(geo, var, key):
+        data.update(_download(year, params, dataset=dataset))
+
+    return _frame(data, var)
+
+def _chunks(geo, var, key=None, chunk_size=49):
+    """Split a download into request parameters for chunks of variables, within the API's limit of 50 variables per request."""
+
+    georequest = geo.request()
+    chunks = []
+
+    for var_chunk in [var[i:(i+chunk_size)] for i in range(0, len(var), chunk_size)]:
+        params = {'get': ','.join(['NAME']+var_chunk)}
+        params.update(georequest)
+        if key is not None: params.update({'key': key})
+        chunks.append(params)
+
+    return chunks
+
+def _frame(data, var):
+    """Build the data frame returned by `download()` from downloaded columns.
+
+    Args:
+        data (OrderedDict): Downloaded columns, including NAME and the geography columns.
+        var (list of str): Census variables to keep as data columns.
+
+    """
+
+    import pandas as pd
+
+    if not data:
+        data = OrderedDict([('NAME', [])] + [(v, []) for v in var])
+
+    data = data.copy()
+    geodata = data.copy()
+    for key in list(geodata.keys()):
+        if key in var:
+            del geodata[key]
+            data[key] = _coerce(data[key])
+        else:
+            del data[key]
+    return pd.DataFrame(data, _geoindex(geodata))
+
+def _coerce(values):
+    """Convert a column of downloaded strings to integers, or floats, leaving it unchanged if neither applies."""
+
+    try:
+        return [int(d) if d is not None else None for d in values]
+    except ValueError:
+        try:
+            return [float(d) if d is not None else None for d in values]
+        except ValueError:
+            return [d for d in values]
+
+def _geoindex(geodata):
+    """Build a list of `censusgeo` objects from the NAME and geography columns of a download."""
+
+    return [censusgeo([(key, geodata[key][i]) for key in geodata if key != 'NAME'], geodata['NAME'][i]) for i in range(len(geodata['NAME']))]
+
+def acs_search(year, field, criterion, tabletype='detail', survey='acs5'):
+    """Search Census variables.
+
+    Args:
+            ACS 3-year estimates, 'acsse' for ACS 1-year supplemental estimates, 'sf1' for SF1 data.
+        year (int): Year of data.
+        field (str): Field in which to search.
+        criterion (str or function): Search criterion. Either string to search for, or a function which will be passed the value of field and return
+            True if a match and False otherwise.
+        tabletype (str, optional): Type of table from which variables are drawn (only applicable to ACS data). Options are 'detail' (detail tables),
+            'subject' (subject tables), 'profile' (data profile tables), 'cprofile' (comparison profile tables).
+        survey (str, optional): 'acs5' for ACS 5-year estimates, or 'acs1' for ACS 1-year estimates.
+
+    Returns:
+        list: List of 3-tuples containing variable names, concepts, and labels matching the search criterion.
+
+    """
+
+    source = dataset(tabletype, survey)
+
+    # Variables are loaded once per year, dataset and session from the catalogue cache
+    from acstools import catalog
+
+    return catalog.catalog(year, dataset=source).search(field, criterion)
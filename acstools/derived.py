@@ -0,0 +1,206 @@
+"""Derived fields (sums, ratios, proportions and products) calculated on downloaded ACS data.
+
+Derived fields are given as a list of formulas of the form
+
+    NAME = function(column, column, ...)
+
+over the `<var>_<year>` columns of a GetOutputTable data frame, e.g.
+
+    TRANSIT_SHARE = percent(B08301_010E_2019, B08301_001E_2019)
+
+Each formula is evaluated on whole columns at once, before the output table is written. When the
+margins of error of the inputs (`<var>M_<year>`) have been downloaded, a `NAME_MOE` column is
+added with the approximations given in the Census Bureau's "Understanding and Using American
+Community Survey Data", chapter 8:
+
+    sum(A, B, ...)      A + B + ...     sqrt(MOE_A^2 + MOE_B^2 + ...)
+    ratio(A, B)         R = A / B       sqrt(MOE_A^2 + R^2 MOE_B^2) / B
+    proportion(A, B)    P = A / B       sqrt(MOE_A^2 - P^2 MOE_B^2) / B, or the ratio formula
+                                        where the value under the square root is negative
+    percent(A, B)       100 P           100 MOE_P
+    product(A, B)       A B             sqrt(A^2 MOE_B^2 + B^2 MOE_A^2)
+"""
+
+import re
+
+import numpy as np
+
+
+#: re.Pattern: A derived field formula, NAME = function(arguments)
+FORMULA = re.compile(r"^\s*(\w+)\s*=\s*(\w+)\s*\((.*)\)\s*$")
+
+#: float: Margin of error annotation for statistically controlled estimates, which have no sampling error
+CONTROLLED_MOE = -555555555
+
+
+def moe_column(column):
+    """Returns the margin of error column for an estimate column, e.g. B01001_001M_2019 for B01001_001E_2019."""
+
+    return re.sub(r"E(_\d{4})$", r"M\1", column)
+
+
+def parse_derived_fields(spec):
+    """Parses derived field formulas.
+
+    Args:
+        spec (str or list): Formulas, as a list or a semicolon-delimited string (the value of the
+            Derived Fields tool parameter).
+
+    Returns:
+        list: List of (name, function, argument list) tuples.
+
+    Raises:
+        ValueError: If a formula can't be parsed, names an unknown function or has the wrong number of arguments.
+
+    """
+
+    if isinstance(spec, str):
+        spec = spec.split(";")
+
+    derived = []
+
+    for formula in spec:
+        formula = formula.strip().strip("'\"")
+
+        if not formula:
+            continue
+
+        match = FORMULA.match(formula)
+
+        if match is None:
+            raise ValueError("Derived field '{0}' should be of the form NAME = function(column, ...)".format(formula))
+
+        name, function, args = match.groups()
+        function = function.lower()
+        args = [a.strip() for a in args.split(",") if a.strip()]
+
+        if function not in FUNCTIONS:
+            raise ValueError("Unknown function '{0}' in derived field {1}; expected one of {2}".format(
+                function, name, ", ".join(FUNCTIONS)))
+
+        if (function == "sum" and not args) or (function != "sum" and len(args) != 2):
+            raise ValueError("Wrong number of columns for {0}() in derived field {1}".format(function, name))
+
+        derived.append((name, function, args))
+
+    return derived
+
+
+def _estimates(df, column):
+    """Returns a column as floats, with the API's negative annotation codes as NaN."""
+
+    x = df[column].to_numpy(float)
+
+    return np.where(x < 0, np.nan, x)
+
+
+def _moes(df, column):
+    """Returns the margins of error for an estimate column, or None if they weren't downloaded."""
+
+    moe = moe_column(column)
+
+    if moe == column or moe not in df.columns:
+        return None
+
+    m = df[moe].to_numpy(float)
+    m = np.where(m == CONTROLLED_MOE, 0, m)
+
+    return np.where(m < 0, np.nan, m)
+
+
+def _divide(a, b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b == 0, np.nan, a / b)
+
+
+def _sum(x, m):
+    estimate = np.sum(x, axis=0)
+    moe = None if m is None else np.sqrt(np.sum(m ** 2, axis=0))
+
+    return estimate, moe
+
+
+def _ratio(x, m):
+    r = _divide(x[0], x[1])
+    moe = None if m is None else _divide(np.sqrt(m[0] ** 2 + r ** 2 * m[1] ** 2), x[1])
+
+    return r, moe
+
+
+def _proportion(x, m):
+    p = _divide(x[0], x[1])
+
+    if m is None:
+        return p, None
+
+    radicand = m[0] ** 2 - p ** 2 * m[1] ** 2
+    radicand = np.where(radicand < 0, m[0] ** 2 + p ** 2 * m[1] ** 2, radicand)
+
+    return p, _divide(np.sqrt(radicand), x[1])
+
+
+def _percent(x, m):
+    p, moe = _proportion(x, m)
+
+    return 100 * p, None if moe is None else 100 * moe
+
+
+def _product(x, m):
+    estimate = x[0] * x[1]
+    moe = None if m is None else np.sqrt(x[0] ** 2 * m[1] ** 2 + x[1] ** 2 * m[0] ** 2)
+
+    return estimate, moe
+
+
+#: dict: Derived field functions, each taking arrays of estimates and margins of error (or None)
+FUNCTIONS = {"sum": _sum, "ratio": _ratio, "proportion": _proportion, "percent": _percent, "product": _product}
+
+
+def derived_columns(derived, margin_of_error=True):
+    """Returns [field name, alias] pairs for the columns added by `derive()`, for field mappings."""
+
+    columns = []
+
+    for name, function, args in derived:
+        columns.append([name, name])
+        if margin_of_error:
+            columns.append([name + "_MOE", "MOE_" + name])
+
+    return columns
+
+
+def derive(df, derived):
+    """Adds derived fields to a data frame.
+
+    Args:
+        df (pandas.DataFrame): GetOutputTable data frame with `<var>_<year>` columns.
+        derived (list): Formulas from `parse_derived_fields()`.
+
+    Returns:
+        pandas.DataFrame: The data frame with a column for each derived field, followed by a
+            `<name>_MOE` column if the margins of error of all its inputs are in the data frame.
+
+    Raises:
+        ValueError: If a formula uses a column that isn't in the data frame.
+
+    """
+
+    df = df.copy()
+
+    for name, function, args in derived:
+        missing = [a for a in args if a not in df.columns]
+
+        if missing:
+            raise ValueError("Derived field {0} uses columns not in the output: {1}".format(name, ", ".join(missing)))
+
+        x = np.array([_estimates(df, a) for a in args])
+        moes = [_moes(df, a) for a in args]
+        m = None if any(moe is None for moe in moes) else np.array(moes)
+
+        estimate, moe = FUNCTIONS[function](x, m)
+
+        df[name] = estimate
+        if moe is not None:
+            df[name + "_MOE"] = moe
+
+    return df
@@ -0,0 +1,120 @@
+"""Asynchronous Census API request engine.
+
+Runs many Census API requests at once (e.g. every county, variable chunk and year of a
+multi-year download) instead of one after another. Requests are made through a pooled
+`requests.Session` on a bounded thread pool, so the number of requests in flight (and open
+connections) never exceeds the engine's concurrency, and are awaited with asyncio.
+
+`fetch()` returns one response like `census._download()`, and `download()` a data frame like
+`census.download()`. The script tools run the engine through `planner.RequestPlan`, with `run()`.
+"""
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from acstools import census
+
+
+#: int: Default maximum number of concurrent Census API requests
+CONCURRENCY = 8
+
+#: tuple: HTTP status codes of failed requests that are retried (the API's transient server errors)
+RETRY_STATUSES = (500, 502, 503, 504)
+
+#: tuple: Seconds to wait to connect to the API, and between bytes of a response (as the proxy's upstream timeout)
+TIMEOUT = (10, 120)
+
+
+class CensusEngine:
+    """Issues Census API requests concurrently.
+
+    Args:
+        concurrency (int, optional): Maximum number of requests in flight at once.
+        baseurl (str, optional): Base URL for requests. Defaults to `census.BASEURL`.
+        retries (int, optional): Number of times a failed connection or server error (HTTP 5xx) is
+            retried, with exponential backoff. A connection or response that stalls for longer than
+            `timeout` is a failed request, and is retried the same way.
+        timeout (tuple, optional): (connect, read) timeouts in seconds.
+
+    """
+
+    def __init__(self, concurrency=CONCURRENCY, baseurl=None, retries=2, timeout=TIMEOUT):
+        self.concurrency = concurrency
+        self.baseurl = baseurl
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, status_forcelist=RETRY_STATUSES, backoff_factor=0.5, allowed_methods=['GET'],
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix='census')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Shut down the request threads and close pooled connections."""
+
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def _get(self, year, params, dataset):
+        return census._response(self.session.get(census._url(year, params, self.baseurl, dataset), timeout=self.timeout))
+
+    async def fetch(self, year, params, dataset=census.DATASET):
+        """Request data from Census API. Returns data in ordered dictionary, like `census._download()`.
+
+        Args:
+            year (int): Year of data.
+            params (dict): Download parameters.
+            dataset (str, optional): Dataset path, e.g. 'acs/acs5/subject'.
+
+        """
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._get, year, params, dataset)
+
+    async def download(self, year, geo, var, key=None, dataset=census.DATASET):
+        """Download data from Census API, requesting all variable chunks at once.
+
+        Args:
+            year (int): Year of data.
+            geo (censusgeo): Geographies for which to download data.
+            var (list of str): Census variables to download.
+            key (str, optional): Census API key.
+            dataset (str, optional): Dataset path, e.g. 'acs/acs5/profile'.
+
+        Returns:
+            pandas.DataFrame: Data frame like that returned by `census.download()`.
+
+        """
+
+        data = OrderedDict()
+
+        for chunk in await asyncio.gather(*[self.fetch(year, params, dataset) for params in census._chunks(geo, var, key)]):
+            data.update(chunk)
+
+        return census._frame(data, var)
+
+
+def run(coro):
+    """Run a coroutine to completion from synchronous code.
+
+    If an event loop is already running in this thread (as in the ArcGIS Pro Python window),
+    the coroutine is run on its own loop in a separate thread."""
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(1) as pool:
+        return pool.submit(asyncio.run, coro).result()
@@ -0,0 +1,102 @@
+"""Generalized copies of boundary layers, for output feature classes that draw and publish quickly.
+
+Census boundary layers are detailed well beyond what a state-wide map needs, and output feature
+classes copied from them draw and publish slowly. `generalized()` returns a copy of a boundary
+layer simplified to a tolerance, with Simplify Polygon, which keeps the boundaries shared by
+neighbouring polygons coincident so that generalized tracts or block groups still tile without
+gaps or overlaps.
+
+Each boundary layer (one vintage, e.g. the 2010 tracts) is simplified once per tolerance, and kept
+in its own file geodatabase in the `geometry` folder of `CACHE_DIR`. Later runs, and runs for any
+other output, join their tables to the cached copies instead of the full-resolution source.
+"""
+
+import os
+import re
+import shutil
+
+from acstools import cache_path
+
+
+#: str: Name of the simplified feature class in each cached geodatabase
+FEATURE_CLASS = 'generalized'
+
+#: re.Pattern: Tolerances of the form '<number> <linear unit>', e.g. '25 Meters'
+TOLERANCE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s+([A-Za-z]+)\s*$')
+
+#: list: Linear unit keywords accepted by geoprocessing tools for a tolerance
+LINEAR_UNITS = ['Centimeters', 'DecimalDegrees', 'Decimeters', 'Feet', 'Inches', 'Kilometers', 'Meters', 'Miles',
+                'Millimeters', 'NauticalMiles', 'USSurveyFeet', 'USSurveyMiles', 'Yards']
+
+
+def parse_tolerances(text):
+    """Parses a semicolon-delimited list of tolerances, e.g. '10 Meters;100 Meters'.
+
+    Raises:
+        ValueError: If a tolerance isn't a number followed by one of `LINEAR_UNITS`.
+
+    """
+
+    units = {u.lower(): u for u in LINEAR_UNITS}
+    tolerances = []
+
+    for item in (text or '').split(';'):
+        if not item.strip():
+            continue
+        match = TOLERANCE.match(item)
+        if match is None or match.group(2).lower() not in units:
+            raise ValueError("Invalid tolerance (expected a number and one of {0}, e.g. '100 Meters'): {1}".format(
+                ', '.join(LINEAR_UNITS), item))
+        tolerances.append('{0} {1}'.format(match.group(1), units[match.group(2).lower()]))
+
+    return tolerances
+
+
+def suffix(tolerance):
+    """Returns the output name suffix for a tolerance, e.g. '_100_Meters' for '100 Meters'."""
+
+    return '_' + re.sub(r'\W+', '_', tolerance).strip('_')
+
+
+def generalized(features, tolerance):
+    """Returns a copy of a polygon layer simplified to a tolerance, from the cache if it was made before.
+
+    Args:
+        features (str): Boundary feature class.
+        tolerance (str): Simplification tolerance, e.g. '100 Meters'.
+
+    Returns:
+        str: Path of the simplified feature class, with the fields of `features`.
+
+    """
+
+    import arcpy as ap
+    from acstools.runs import temporary_path
+
+    desc = ap.Describe(features)
+    ext = desc.extent
+    gdb = cache_path('geometry', desc.catalogPath, ap.management.GetCount(features)[0], ext.XMin, ext.YMin,
+                     ext.XMax, ext.YMax, desc.spatialReference.factoryCode, tolerance, extension='.gdb')
+    out = os.path.join(gdb, FEATURE_CLASS)
+
+    if os.path.exists(gdb):
+        return out
+
+    # Built under a temporary name and moved into place, so other runs never read a partial copy
+    tmp = temporary_path(gdb)
+    os.makedirs(os.path.dirname(gdb), exist_ok=True)
+    ap.management.CreateFileGDB(os.path.dirname(tmp), os.path.basename(tmp))
+
+    try:
+        ap.cartography.SimplifyPolygon(features, os.path.join(tmp, FEATURE_CLASS), 'POINT_REMOVE', tolerance,
+                                       '0 SquareMeters', 'RESOLVE_ERRORS', 'NO_KEEP')
+        ap.management.ClearWorkspaceCache(tmp)
+        os.replace(tmp, gdb)
+    except OSError:
+        # Another run cached the same tolerance first
+        if not os.path.exists(gdb):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return out
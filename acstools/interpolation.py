@@ -0,0 +1,55 @@
+"""Area-weighted interpolation of ACS estimates between geography vintages and polygon layers.
+
+ACS releases before 2020 use 2010 tract and block group boundaries, and later releases use 2020
+boundaries, so estimates for different years can't be compared geography by geography. They can
+be compared after reweighting onto common polygons: the 2020 tracts, or a layer of our own.
+
+Overlay weights (the share of each source polygon's area in each target polygon) are computed once
+per source and target layer with `ZoneWeights.from_layers`, which indexes both layers spatially and
+caches the weights under the fingerprints of the layers' contents. Interpolating again, for any
+table or year, reuses the cached sparse weights and skips the geometry work entirely.
+"""
+
+from acstools.layers import find_geoid_field
+from acstools.zones import ZoneWeights
+
+
+def overlay_weights(source_features, target_features, target_field, source_field=None):
+    """Returns the cached area weights from a source boundary layer to a target polygon layer.
+
+    Args:
+        source_features (str): Boundaries matching the downloaded data (e.g. 2010 tracts).
+        target_features (str): Polygons to interpolate onto (e.g. 2020 tracts or planning areas).
+        target_field (str): ID field of `target_features`.
+        source_field (str, optional): GEOID field of `source_features`. Found automatically if None.
+
+    """
+
+    if source_field is None:
+        source_field = find_geoid_field(source_features)
+
+    return ZoneWeights.from_layers(source_features, source_field, target_features, target_field)
+
+
+def interpolate(df, weights, target_field="GEOID"):
+    """Reweights a per-year GetOutputTable data frame (indexed by GEOID) onto target polygons.
+
+    Estimates are allocated in proportion to area and margins of error are combined with the ACS
+    approximation for sums. The Geography column is replaced by the target polygon ID, as text (like
+    GEOIDs) whatever the type of the target ID field, so output matches between cached and new weights.
+
+    Args:
+        df (pandas.DataFrame): Data frame to interpolate.
+        weights (ZoneWeights): Weights from `overlay_weights()`.
+        target_field (str, optional): Name of the output index.
+
+    Returns:
+        pandas.DataFrame: Data frame with one row per target polygon.
+
+    """
+
+    out = weights.aggregate(df, target_field)
+    out.index = out.index.astype(str)
+    out.insert(0, "Geography", out.index.astype(str))
+
+    return out
@@ -0,0 +1,93 @@
+"""ArcGIS layer helpers shared by the overlay and geometry modules.
+
+Requires arcpy, which is imported when the functions are called so the rest of the package
+can be used without ArcGIS.
+"""
+
+import hashlib
+import json
+
+
+#: list: GEOID fields found in Census TIGER/Line and cartographic boundary layers, in order of preference
+GEOID_FIELDS = ['GEOID', 'GEOID20', 'GEOID10', 'GEOIDFQ']
+
+
+def layer_fingerprint(features, id_field):
+    """Returns a fingerprint of a layer's contents, which changes when features are added, removed,
+    renumbered or reshaped, but not when the layer is copied or moved.
+
+    Args:
+        features (str): Feature class or layer.
+        id_field (str): Field identifying each feature.
+
+    """
+
+    import arcpy as ap
+
+    desc = ap.Describe(features)
+    rows = []
+
+    with ap.da.SearchCursor(features, [id_field, 'SHAPE@AREA', 'SHAPE@LENGTH']) as cursor:
+        for row in cursor:
+            rows.append((str(row[0]), round(row[1] or 0, 3), round(row[2] or 0, 3)))
+
+    rows.sort()
+
+    h = hashlib.sha1(json.dumps([desc.spatialReference.factoryCode, desc.spatialReference.name]).encode('utf-8'))
+    h.update(json.dumps(rows).encode('utf-8'))
+
+    return h.hexdigest()
+
+
+def table_fingerprint(table, fields):
+    """Returns a fingerprint of the values of some fields of a table, which changes when rows are added,
+    removed or edited, for tables (e.g. in a geodatabase) without a file modification time.
+
+    Args:
+        table (str): Table or feature class.
+        fields (list): Fields to fingerprint.
+
+    """
+
+    import arcpy as ap
+
+    with ap.da.SearchCursor(table, fields) as cursor:
+        rows = sorted([str(v) for v in row] for row in cursor)
+
+    return hashlib.sha1(json.dumps(rows).encode('utf-8')).hexdigest()
+
+
+def ensure_spatial_index(features):
+    """Adds a spatial index to a feature class that doesn't have one. Layers that can't be indexed
+    (e.g. read-only enterprise geodatabase data) are left unchanged."""
+
+    import arcpy as ap
+
+    desc = ap.Describe(features)
+
+    if getattr(desc, 'hasSpatialIndex', True):
+        return
+
+    try:
+        ap.management.AddSpatialIndex(features)
+    except ap.ExecuteError:
+        ap.AddWarning('Unable to add a spatial index to ' + str(features))
+
+
+def find_geoid_field(features):
+    """Returns the GEOID field of a Census boundary layer.
+
+    Raises:
+        ValueError: If the layer has none of the fields in `GEOID_FIELDS`.
+
+    """
+
+    import arcpy as ap
+
+    fields = {f.name.upper(): f.name for f in ap.ListFields(features)}
+
+    for field in GEOID_FIELDS:
+        if field in fields:
+            return fields[field]
+
+    raise ValueError('No GEOID field found in {0}; expected one of {1}'.format(features, ', '.join(GEOID_FIELDS)))
@@ -0,0 +1,129 @@
+"""Parallel writing of large output tables, one county partition per worker process.
+
+Converting a state-wide block group CSV with hundreds of fields to a geodatabase table is a
+single-threaded geoprocessing call, and takes most of a large run. Instead, the CSV is split by
+county, each county is converted in its own worker process (into its own scratch file
+geodatabase, since a file geodatabase only takes one writer at a time), and the county tables are
+appended to the output table, or copied next to it as a partitioned set.
+
+Appending is still done by one process, but it starts with the first county: the output table is
+created from the first county table's schema, and each county is appended, in county order, as
+soon as it and the counties before it are written, while the workers go on converting the rest.
+Only the appends of the last counties to finish are left once the workers are done, rather than a
+merge of every county.
+
+Worker processes run the Python interpreter of the ArcGIS Pro environment, so this must be called
+from the ArcGIS Pro Python environment.
+"""
+
+import multiprocessing
+import os
+import sys
+
+
+#: int: Rows read at a time when splitting a CSV file by county
+CHUNK_ROWS = 100000
+
+
+def county_of(geoid):
+    """Returns the state and county FIPS codes in a GEOID or API GEO_ID (e.g. '47037' for '1500000US470370101001')."""
+
+    return str(geoid).split('US')[-1][:5]
+
+
+def split_csv(csv_table, folder):
+    """Splits an output CSV file (indexed by GEOID) into one file per county, reading it in chunks.
+
+    Args:
+        csv_table (str): CSV file written by GetOutputTable.
+        folder (str): Folder for the county files.
+
+    Returns:
+        list: (county, CSV file) tuples, ordered by county.
+
+    """
+
+    import pandas as pd
+
+    paths = {}
+
+    for chunk in pd.read_csv(csv_table, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS):
+        for county, rows in chunk.groupby(chunk.iloc[:, 0].map(county_of), sort=False):
+            path = paths.get(county)
+            if path is None:
+                path = paths[county] = os.path.join(folder, 'county_' + county + '.csv')
+            rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+    return sorted(paths.items())
+
+
+def _write(job):
+    """Converts one county CSV file to a table in its own scratch geodatabase (run in a worker process)."""
+
+    import arcpy as ap
+    from acstools.schema import field_mappings
+
+    county, csv_path, field_list, field_types, fix_geoid = job
+    folder = os.path.dirname(csv_path)
+    gdb = os.path.join(folder, 'county_' + county + '.gdb')
+
+    ap.management.CreateFileGDB(folder, os.path.basename(gdb))
+    ap.conversion.TableToTable(csv_path, gdb, 'county_' + county, '', field_mappings(csv_path, field_list, field_types))
+    table = os.path.join(gdb, 'county_' + county)
+
+    if fix_geoid:
+        ap.management.CalculateField(table, 'GEOID', "!GEOID!.split('US')[-1]", 'PYTHON')
+
+    return county, table
+
+
+def _context():
+    ctx = multiprocessing.get_context('spawn')
+
+    # In ArcGIS Pro, sys.executable is ArcGISPro.exe; workers must run the environment's Python
+    if sys.platform == 'win32' and not os.path.basename(sys.executable).lower().startswith('python'):
+        ctx.set_executable(os.path.join(sys.exec_prefix, 'pythonw.exe'))
+
+    return ctx
+
+
+def write_partitions(partitions, out_table, field_list, field_types=None, workers=None, merge=True, fix_geoid=True, message=None):
+    """Writes county CSV files to geodatabase tables in parallel worker processes.
+
+    Args:
+        partitions (list): (county, CSV file) tuples from `split_csv()`.
+        out_table (str): Output table path.
+        field_list (list): [field name, alias] pairs of the output fields.
+        field_types (dict, optional): (field type, length) pairs by field name, from `schema.field_types()`.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        merge (bool, optional): If True, the county tables are appended to `out_table`. Otherwise they
+            are copied to tables named `<out_table>_<county FIPS>`.
+        fix_geoid (bool, optional): Whether to strip the summary level prefix from GEOIDs.
+        message (function, optional): Function called with progress messages.
+
+    Returns:
+        list: Output table paths.
+
+    """
+
+    import arcpy as ap
+
+    jobs = [(county, path, field_list, field_types, fix_geoid) for county, path in partitions]
+    out = []
+
+    with _context().Pool(min(workers or os.cpu_count(), len(jobs)) or 1) as pool:
+        # Results come back in county order, so the output rows are in the same order as the CSV file
+        for i, (county, table) in enumerate(pool.imap(_write, jobs), 1):
+            if merge:
+                if not out:
+                    out.append(out_table)
+                    ap.management.CreateTable(os.path.dirname(out_table), os.path.basename(out_table), table)
+                # Every county table has the same fields and types, from the same field mappings
+                ap.management.Append(table, out_table, 'NO_TEST')
+            else:
+                out.append(out_table + '_' + county)
+                ap.management.Copy(table, out[-1])
+            if message is not None:
+                message("Wrote county {0} ({1} of {2})".format(county, i, len(jobs)))
+
+    return out
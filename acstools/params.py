@@ -0,0 +1,106 @@
+"""Parsing of tool parameter values, for the tool scripts and the toolbox validator.
+
+Uses only the standard library, so the validator can import it without loading pandas,
+requests or the rest of the download code, which cost most of a second each time the tool
+dialog is opened. Parsed values are cached, so re-validating after a parameter change doesn't
+parse unchanged parameters again.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+import re
+
+
+def parse_output_fields(output_fields):
+    """Parses the values of the Output Fields tool parameter, once, into fields per year.
+
+    Args:
+        output_fields (list): Output Fields values, each of the form "'alias' 'field ID (year)'".
+
+    Returns:
+        OrderedDict: Lists of [field ID, alias] pairs keyed by year (int), in order of first appearance.
+
+    """
+
+    year_fields = OrderedDict()
+
+    for year, field, alias in _parse_output_fields(tuple(output_fields)):
+        year_fields.setdefault(year, []).append([field, alias])
+
+    return year_fields
+
+
+@lru_cache(maxsize=32)
+def _parse_output_fields(output_fields):
+    out = []
+
+    for f in output_fields:
+        parts = f.split(" ")
+        out.append((int(parts[-1].lstrip("(").rstrip(")'")), parts[-2].lstrip("'"), parts[0].lstrip("'")))
+
+    return tuple(out)
+
+
+@lru_cache(maxsize=32)
+def output_years(output_fields):
+    """Returns the years in the text of the Output Fields parameter, in order of first appearance.
+
+    Args:
+        output_fields (str): Semicolon-delimited Output Fields parameter text.
+
+    """
+
+    return tuple(OrderedDict.fromkeys(int(y) for y in re.findall(r"\((\d{4})\)", output_fields or "")))
+
+
+def add_margins_of_error(fields):
+    """Returns a list of [field ID, alias] pairs with each estimate followed by its margin of error.
+
+    Args:
+        fields (list): List of [field ID, alias] pairs for estimates.
+
+    """
+
+    field_list = []
+
+    for field in fields:
+        field_list.append([field[0], field[1]])
+        field_list.append([field[0].replace("E", "M"), "MOE_" + field[1].lstrip("Estimate!!")])
+
+    return field_list
+
+
+def unique_fields(fields):
+    """Returns a list of [field ID, alias] pairs without repeated field IDs (e.g. a variable picked from
+    two overlapping tables), keeping the first alias and the order of first appearance."""
+
+    seen = set()
+    out = []
+
+    for field in fields:
+        if field[0] not in seen:
+            seen.add(field[0])
+            out.append(field)
+
+    return out
+
+
+@lru_cache(maxsize=8)
+def state_names(year):
+    """Returns the names of the states with ACS data for a year, for the State parameter list."""
+
+    from acstools.census import censusgeo, geographies
+
+    return tuple(sorted(geographies(censusgeo([('state', '*')]), int(year))))
+
+
+@lru_cache(maxsize=64)
+def county_names(state_name, year):
+    """Returns the names of the counties in a state (e.g. "Davidson County"), for the Counties parameter list."""
+
+    from acstools.census import censusgeo, geographies
+
+    state_num = str(geographies(censusgeo([('state', '*')]), int(year))[state_name]).split(":")[-1]
+    counties = geographies(censusgeo([('state', state_num), ('county', '*')]), int(year))
+
+    return tuple(sorted(name.rsplit(", ", 1)[0] for name in counties))
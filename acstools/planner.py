@@ -0,0 +1,243 @@
+"""Planning of the Census API requests needed for a download.
+
+A `RequestPlan` collects the fields wanted for each year and turns them into the smallest set
+of API calls before anything is downloaded:
+
+- fields requested more than once for a year (e.g. the same variable picked from two tables)
+  are downloaded once;
+- NAME and GEO_ID are requested only with the first chunk of variables for each geography,
+  rather than with every chunk;
+- variables of subject, data profile and comparison profile tables are requested from their
+  own datasets, and joined to the detail table variables;
+- a selection of counties is requested county by county, or state-wide and filtered, whichever
+  takes fewer calls for the share of the state selected;
+- a selection of GEOIDs (e.g. the tracts near a study area) is requested only in the counties
+  containing them, tracts by name and block groups county-wide, and filtered.
+
+The plan is then run through the asyncio request engine, and returns one data frame per year in
+the format of `census.download()`.
+"""
+
+import asyncio
+from collections import OrderedDict
+
+import pandas as pd
+
+from acstools import census
+from acstools.engine import CONCURRENCY, CensusEngine, run
+
+
+#: int: Maximum number of variables (including NAME and GEO_ID) in a single Census API request
+MAX_VARIABLES = 50
+
+#: float: Share of a state's counties above which chosen counties are requested state-wide
+STATEWIDE_SHARE = 0.25
+
+#: list: Geographic components returned as columns by the Census API
+GEO_COLUMNS = ['state', 'county', 'tract', 'block group']
+
+#: dict: GEOID lengths of the geographies below the state, by the last geographic component requested
+GEOID_LENGTHS = {'county': 5, 'tract': 11, 'block group': 12}
+
+
+class RequestPlan:
+    """Minimal set of Census API requests for downloading fields over one or more years.
+
+    Args:
+        state_num (str): State FIPS code.
+        geo_args (list): Geography arguments below the county level, e.g. [("tract", "*")].
+        counties (list or str): List of county FIPS codes, or "'All counties'".
+        total_counties (int, optional): Number of counties in the state, used to decide whether
+            chosen counties are requested state-wide. If None, they are requested by county.
+        key (str, optional): Census API key.
+        survey (str, optional): 'acs5' for ACS 5-year estimates, or 'acs1' for ACS 1-year estimates.
+        geoids (list, optional): GEOIDs of the geographies to download, or of the larger geographies
+            containing them (e.g. tracts, for block groups), e.g. from `aoi.geoids_in_area()`. If given,
+            `counties` is ignored and only the counties containing them are requested.
+
+    Raises:
+        ValueError: If `geoids` are of a smaller geography than the one downloaded (e.g. block groups,
+            for tracts), which would match no rows.
+
+    """
+
+    def __init__(self, state_num, geo_args, counties, total_counties=None, key=None, survey="acs5", geoids=None):
+        self.state_num = state_num
+        self.geo_args = list(geo_args)
+        self.key = key
+        self.survey = survey
+        self.year_fields = OrderedDict()
+        self.geoids = None
+
+        if geoids is not None:
+            self.geoids = set(g for g in (str(g).split("US")[-1] for g in geoids) if g.startswith(state_num))
+            level = self.geo_args[-1][0] if self.geo_args else "county"
+            finer = sorted(g for g in self.geoids if len(g) > GEOID_LENGTHS[level])
+            if finer:
+                raise ValueError("The selected geographies (e.g. GEOID {0}) are smaller than the {1} geography "
+                                 "downloaded; use boundaries of {1}s or larger geographies.".format(finer[0], level))
+            self.counties = sorted(set(g[2:5] for g in self.geoids))
+            self.statewide = False
+        elif counties == "'All counties'":
+            self.counties = None
+            self.statewide = True
+        else:
+            self.counties = [str(county).zfill(3) for county in counties]
+            self.statewide = total_counties is not None and len(self.counties) > total_counties * STATEWIDE_SHARE
+
+    def add(self, year, fields):
+        """Adds fields to download for a year. Fields already in the plan for that year are not requested again."""
+
+        planned = self.year_fields.setdefault(int(year), [])
+
+        for field in fields:
+            if field not in planned and field not in ("NAME", "GEO_ID"):
+                planned.append(field)
+
+    def geographies(self):
+        """Returns the censusgeo objects requested for each year."""
+
+        if self.statewide:
+            return [census.censusgeo([("state", self.state_num), ("county", "*")] + self.geo_args)]
+
+        return [census.censusgeo([("state", self.state_num), ("county", county)] + self._geo_args(county))
+                for county in self.counties]
+
+    def _geo_args(self, county):
+        """Returns the geography arguments below a county, naming the selected tracts if there are any."""
+
+        if self.geoids is None or self.geo_args != [("tract", "*")]:
+            return self.geo_args
+
+        prefix = self.state_num + county
+        tracts = sorted(g[5:] for g in self.geoids if g.startswith(prefix) and len(g) == 11)
+
+        return [("tract", ",".join(tracts))] if tracts else self.geo_args
+
+    def chunks(self, fields, names=True):
+        """Splits fields into request variable lists, with NAME and GEO_ID in the first only if `names` is True."""
+
+        if not names:
+            return [fields[i:i + MAX_VARIABLES] for i in range(0, len(fields), MAX_VARIABLES)]
+
+        chunks = [["NAME", "GEO_ID"] + fields[:MAX_VARIABLES - 2]]
+        rest = fields[MAX_VARIABLES - 2:]
+
+        chunks += [rest[i:i + MAX_VARIABLES] for i in range(0, len(rest), MAX_VARIABLES)]
+
+        return chunks
+
+    def requests(self, fields):
+        """Splits a year's fields into (dataset, variable list) pairs: grouped by the dataset of their table
+        type (see `census.table_type()`), then chunked, with NAME and GEO_ID in the first only."""
+
+        groups = OrderedDict([(census.dataset("detail", self.survey), [])])
+
+        for field in fields:
+            groups.setdefault(census.dataset(census.table_type(field), self.survey), []).append(field)
+
+        if len(groups) > 1 and not groups[census.dataset("detail", self.survey)]:
+            del groups[census.dataset("detail", self.survey)]
+
+        return [(dataset, chunk) for n, (dataset, group) in enumerate(groups.items())
+                for chunk in self.chunks(group, names=n == 0)]
+
+    def calls(self):
+        """Returns the planned requests as a list of (year, geography index, dataset, download parameters) tuples."""
+
+        calls = []
+
+        for year, fields in self.year_fields.items():
+            for i, geo in enumerate(self.geographies()):
+                for dataset, chunk in self.requests(fields):
+                    params = {"get": ",".join(chunk)}
+                    params.update(geo.request())
+                    if self.key is not None: params.update({"key": self.key})
+                    calls.append((year, i, dataset, params))
+
+        return calls
+
+    def __len__(self):
+        return len(self.calls())
+
+    def summary(self):
+        """Returns a one-line description of the plan for tool messages."""
+
+        if self.geoids is not None:
+            scope = "{0} geographies in {1} county request(s) per year".format(len(self.geoids), len(self.counties))
+        elif self.statewide:
+            scope = "state-wide"
+        else:
+            scope = "{0} county request(s) per year".format(len(self.counties))
+
+        return "Planned {0} Census API requests: {1} year(s), {2} ({3} variables in total)".format(
+            len(self), len(self.year_fields), scope,
+            sum(len(fields) for fields in self.year_fields.values()))
+
+    def _assemble(self, fields, chunks):
+        """Combines the responses for one year and geography into a `download()` data frame. Geographies
+        without data (empty responses) give an empty data frame."""
+
+        chunks = [chunk for chunk in chunks if chunk]
+
+        if not chunks:
+            return census._frame(OrderedDict(), ["GEO_ID"] + fields)
+
+        merged = pd.DataFrame(chunks[0])
+        keys = [c for c in merged.columns if c in GEO_COLUMNS]
+
+        for chunk in chunks[1:]:
+            merged = merged.merge(pd.DataFrame(chunk), on=keys, how="left")
+
+        if self.statewide and self.counties is not None:
+            merged = merged[merged["county"].isin(self.counties)]
+
+        if self.geoids is not None:
+            # GEOIDs may be of a larger geography than requested (e.g. tracts for block groups)
+            geoid = merged["GEO_ID"].map(lambda g: str(g).split("US")[-1])
+            keep = pd.Series(False, index=merged.index)
+            for length in set(len(g) for g in self.geoids):
+                keep |= geoid.str[:length].isin(self.geoids)
+            merged = merged[keep]
+
+        merged = merged.astype(object).where(merged.notna(), None)
+        data = OrderedDict((c, merged[c].tolist()) for c in merged.columns)
+
+        for field in fields:
+            data.setdefault(field, [None] * len(merged))
+
+        return census._frame(data, ["GEO_ID"] + fields)
+
+    async def _execute(self, engine):
+        calls = self.calls()
+        results = await asyncio.gather(*[engine.fetch(year, params, dataset) for year, i, dataset, params in calls])
+
+        grouped = OrderedDict()
+
+        for (year, i, dataset, params), result in zip(calls, results):
+            grouped.setdefault(year, OrderedDict()).setdefault(i, []).append(result)
+
+        frames = OrderedDict()
+
+        for year, geos in grouped.items():
+            fields = self.year_fields[year]
+            assembled = [self._assemble(fields, chunks) for chunks in geos.values()]
+            # Geographies without data are left out, so they don't turn integer columns into floats
+            frames[year] = pd.concat([df for df in assembled if len(df)] or assembled[:1])
+
+        return frames
+
+    def execute(self, concurrency=CONCURRENCY):
+        """Runs the plan.
+
+        Args:
+            concurrency (int, optional): Maximum number of requests in flight at once.
+
+        Returns:
+            OrderedDict: Data frames like those returned by `census.download()` for GEO_ID and the
+                planned fields, keyed by year.
+
+        """
+
+        with CensusEngine(concurrency) as engine:
+            return run(self._execute(engine))
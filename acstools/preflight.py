@@ -0,0 +1,147 @@
+"""Pre-flight checks of selected variables against the variable catalogues.
+
+Table definitions change between ACS releases: variables are added, dropped and renumbered
+(e.g. when a line is inserted in a table), so a multi-year selection can name a variable that
+doesn't exist in one of its years. The Census API only reports this when that request is made,
+possibly after minutes of downloads. `check_fields()` checks every selected variable against the
+cached catalogue of its year before anything is downloaded, and for each one that is missing
+suggests the variable with the same concept and label in that year, and the years in which it
+does exist. Variables of subject and profile tables are checked against the catalogues of their
+own datasets.
+
+Only the catalogues of the selected years are needed when every variable exists. Those of the
+adjacent years, searched for the definitions of missing variables, are loaded only when a
+variable is missing.
+"""
+
+from difflib import get_close_matches
+import re
+
+from acstools import catalog, census
+
+
+def _normalize(text):
+    """Normalizes a concept or label for comparison across years, which differ in case and in the colons
+    added after headings from 2019 (e.g. 'Estimate!!Total' and 'Estimate!!Total:')."""
+
+    return re.sub(r'\s+', ' ', (text or '').replace(':', '')).strip().lower()
+
+
+def _definition(variable):
+    return _normalize(variable.get('concept')) + '|' + _normalize(variable.get('label'))
+
+
+def _catalogs(years, dataset=census.DATASET):
+    """Returns the catalogues of a dataset that could be loaded for a list of years, by year. Years whose
+    catalogue can't be downloaded (e.g. not yet released) are left out."""
+
+    import requests
+
+    catalog.prefetch(*years, dataset=dataset)
+    out = {}
+
+    for year in years:
+        try:
+            out[year] = catalog.catalog(year, dataset=dataset)
+        except requests.RequestException:
+            pass
+
+    return out
+
+
+def suggest(name, year, catalogs):
+    """Returns the variable in a year's catalogue matching a variable from other years, or None.
+
+    Args:
+        name (str): Variable name (e.g. 'B08301_021E').
+        year (int): Year the variable is missing from.
+        catalogs (dict): Catalogues by year, including `year` and others containing `name`.
+
+    """
+
+    reference = next((c.variables[name] for y, c in catalogs.items() if y != year and name in c.variables), None)
+
+    if reference is None or year not in catalogs:
+        return None
+
+    target = catalogs[year].variables
+    suffix = name[-1]
+    definitions = {}
+
+    for k, v in target.items():
+        if k[-1] == suffix and v.get('group') == reference.get('group'):
+            definitions.setdefault(_definition(v), k)
+
+    match = definitions.get(_definition(reference))
+
+    if match is None:
+        close = get_close_matches(_definition(reference), list(definitions), n=1, cutoff=0.85)
+        match = definitions[close[0]] if close else None
+
+    return match
+
+
+def check_fields(year_fields, adjacent=1, survey='acs5'):
+    """Checks that every selected variable exists in its year, before any data is requested.
+
+    Args:
+        year_fields (dict): Lists of [field ID, alias] pairs (or field IDs) keyed by year.
+        adjacent (int, optional): Years either side of the selection also searched for the missing
+            variables' definitions.
+        survey (str, optional): 'acs5' for ACS 5-year estimates, or 'acs1' for ACS 1-year estimates.
+
+    Raises:
+        ValueError: If any variable is missing, describing each one with a suggested replacement.
+
+    """
+
+    def name_of(field):
+        return field[0] if isinstance(field, (list, tuple)) else field
+
+    def dataset(field):
+        return census.dataset(census.table_type(name_of(field)), survey)
+
+    year_fields = {int(y): fields for y, fields in year_fields.items()}
+    datasets = sorted(set(dataset(f) for fields in year_fields.values() for f in fields))
+    years = {d: sorted(y for y, fields in year_fields.items() if any(dataset(f) == d for f in fields)) for d in datasets}
+
+    for d in datasets:
+        catalog.prefetch(*years[d], dataset=d)
+
+    # The selected years' catalogues first: nothing else is loaded if every variable exists
+    by_dataset = {d: _catalogs(years[d], d) for d in datasets}
+    problems = []
+    missing = []
+
+    for year, fields in year_fields.items():
+        for d in datasets:
+            if year in years[d] and year not in by_dataset[d]:
+                problems.append('No {0} variable catalogue is available for {1}.'.format(d, year))
+
+        for field in fields:
+            catalogs = by_dataset[dataset(field)]
+            if year in catalogs and name_of(field) not in catalogs[year].variables:
+                missing.append((year, name_of(field), dataset(field)))
+
+    # The adjacent years are only searched to describe missing variables
+    adjacent_years = sorted(set(y + i for y in year_fields for i in range(-adjacent, adjacent + 1)) - set(year_fields))
+
+    for d in sorted(set(m[2] for m in missing)):
+        by_dataset[d].update(_catalogs(adjacent_years, d))
+
+    for year, name, d in missing:
+        catalogs = by_dataset[d]
+        problem = '{0} does not exist in {1}.'.format(name, year)
+        match = suggest(name, year, catalogs)
+        found = [y for y in sorted(catalogs) if name in catalogs[y].variables]
+
+        if match is not None:
+            problem += ' The matching variable in {0} is {1} ({2}).'.format(
+                year, match, catalogs[year].variables[match].get('label'))
+        if found:
+            problem += ' {0} exists in {1}.'.format(name, ', '.join(str(y) for y in found))
+
+        problems.append(problem)
+
+    if problems:
+        raise ValueError('\n'.join(problems))
@@ -0,0 +1,280 @@
+"""Caching proxy for sharing one team's Census API traffic.
+
+Run the proxy on a machine the team can reach, and point the script tools at it by setting
+CENSUS_API_BASEURL=http://<host>:8765/data/ on each workstation. Then each catalogue, geography list
+and table is fetched from the Census API once for the whole team:
+
+- responses for a data release (paths under /data/<year>/) never change once published, and
+  are cached on disk indefinitely; other responses (e.g. the /data.json dataset list) are cached
+  for `max_age` seconds;
+- identical requests that arrive while the first is still being fetched wait for its response,
+  rather than all being sent upstream;
+- requests are matched regardless of parameter order and API key, and are forwarded upstream with
+  the key of the request that fetched them;
+- only successful responses are cached, so failures are retried by the next request.
+
+Hit rates and request counts are served as JSON at /stats.
+
+Usage:
+    python -m acstools.proxy --host 0.0.0.0 --port 8765 --cache /srv/census_cache
+    python -m acstools.proxy --upstream http://127.0.0.1:8766    (e.g. a mock API for testing)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from acstools import CACHE_DIR
+from acstools.runs import replace_file, temporary_path
+
+
+#: str: Census API root the proxy fetches from
+UPSTREAM = 'https://api.census.gov'
+
+#: re.Pattern: Paths of published data releases, whose responses never change
+RELEASE_PATH = re.compile(r'^/data/\d{4}/')
+
+#: int: Seconds other responses are cached for
+MAX_AGE = 24 * 60 * 60
+
+
+def request_key(path, query):
+    """Returns a normalized key for a request, ignoring parameter order and the API key. Also used by
+    the mock API in benchmarks/mock_census.py to match recordings.
+
+    Args:
+        path (str): Request path (e.g. '/data/2021/acs/acs5').
+        query (str): Raw query string."""
+
+    parts = sorted(p for p in query.split('&') if p and not p.startswith('key='))
+
+    return path.rstrip('/') + '?' + '&'.join(parts)
+
+
+class _Server(ThreadingHTTPServer):
+    """HTTP server with a connection backlog long enough for a team's concurrent requests."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def _is_json(body):
+    """Returns True if a response body is a JSON document."""
+
+    try:
+        json.loads(body.decode('utf-8'))
+    except ValueError:
+        return False
+
+    return True
+
+
+class _Pending:
+    """Response to a request being fetched upstream, shared with identical requests waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class CensusProxy:
+    """Threaded HTTP server caching Census API responses.
+
+    Args:
+        upstream (str, optional): API root to fetch from.
+        cache_dir (str, optional): Folder for cached responses. Defaults to the `proxy` folder of `CACHE_DIR`.
+        max_age (int, optional): Seconds responses outside data releases are cached for.
+        host (str, optional): Host to bind.
+        port (int, optional): Port to bind; 0 picks a free port.
+        timeout (float, optional): Seconds to wait for the upstream API.
+
+    """
+
+    def __init__(self, upstream=UPSTREAM, cache_dir=None, max_age=MAX_AGE, host='127.0.0.1', port=8765, timeout=120):
+        self.upstream = upstream.rstrip('/')
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, 'proxy')
+        self.max_age = max_age
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.stats = {'requests': 0, 'hits': 0, 'deduplicated': 0, 'misses': 0, 'upstream_errors': 0}
+        self.httpd = _Server((host, port), self._handler())
+        self.thread = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def baseurl(self):
+        """str: Base URL to use in place of 'https://api.census.gov/data/'."""
+
+        host, port = self.httpd.server_address[:2]
+
+        return 'http://{0}:{1}/data/'.format(host, port)
+
+    def start(self):
+        """Starts serving on a background thread and returns the proxy's base URL."""
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+        return self.baseurl
+
+    def stop(self):
+        """Stops the server."""
+
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def summary(self):
+        """Returns the request counts and the share of requests answered without going upstream."""
+
+        with self.lock:
+            stats = dict(self.stats)
+
+        served = stats['hits'] + stats['deduplicated']
+        stats['hit_rate'] = served / stats['requests'] if stats['requests'] else 0.0
+
+        return stats
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json.gz')
+
+    def _cached(self, key, path):
+        """Returns the cached response body for a request, or None if it isn't cached or has expired."""
+
+        file = self._path(key)
+
+        try:
+            if not RELEASE_PATH.match(path) and time.time() - os.path.getmtime(file) > self.max_age:
+                return None
+            with gzip.open(file, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _store(self, key, body):
+        file = self._path(key)
+        tmp = temporary_path(file)
+
+        with gzip.open(tmp, 'wb') as f:
+            f.write(body)
+
+        replace_file(tmp, file)
+
+    def _fetch(self, path, query):
+        """Returns a (status, body) tuple from the upstream API."""
+
+        try:
+            with urllib.request.urlopen(self.upstream + path + '?' + query, timeout=self.timeout) as r:
+                return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except OSError as e:
+            return 502, str(e).encode('utf-8')
+
+    def get(self, path, query):
+        """Returns a (status, body) tuple for a request, from the cache, a pending identical request,
+        or the upstream API."""
+
+        self._count('requests')
+        key = request_key(path, query)
+        body = self._cached(key, path)
+
+        if body is not None:
+            self._count('hits')
+            return 200, body
+
+        with self.lock:
+            pending = self.pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self.pending[key] = _Pending()
+
+        if not leader:
+            pending.done.wait()
+            self._count('deduplicated')
+            return pending.result
+
+        try:
+            self._count('misses')
+            pending.result = self._fetch(path, query)
+
+            # Only data responses are cached: the API also answers some errors (e.g. an invalid key) with
+            # a 200 HTML page, which must not be served to everyone sharing the cache
+            if pending.result[0] == 200 and _is_json(pending.result[1]):
+                self._store(key, pending.result[1])
+            else:
+                self._count('upstream_errors')
+        except Exception as e:
+            pending.result = (502, str(e).encode('utf-8'))
+            raise
+        finally:
+            # The response is cached before the request stops being pending, so later requests hit the cache
+            with self.lock:
+                del self.pending[key]
+            pending.done.set()
+
+        return pending.result
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+
+                if path.rstrip('/') == '/stats':
+                    status, body = 200, json.dumps(server.summary()).encode('utf-8')
+                else:
+                    status, body = server.get(path, query)
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json' if status == 200 else 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='host to bind (0.0.0.0 to serve the network)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--upstream', default=UPSTREAM, help='API root to fetch from')
+    parser.add_argument('--cache', help='folder for cached responses')
+    parser.add_argument('--max-age', type=int, default=MAX_AGE, help='seconds to cache responses outside data releases')
+    args = parser.parse_args()
+
+    proxy = CensusProxy(args.upstream, args.cache, args.max_age, args.host, args.port)
+
+    print('Serving cached Census API at ' + proxy.baseurl)
+
+    try:
+        proxy.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.httpd.server_close()
+        print(json.dumps(proxy.summary()))
+
+
+if __name__ == '__main__':
+    main()
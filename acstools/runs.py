@@ -0,0 +1,50 @@
+"""Isolation of tool runs, so that several downloads can run side by side on one machine.
+
+Each run writes its intermediate files to its own scratch folder, gives its layers and
+in-memory datasets names no other run uses, and passes full paths to geoprocessing tools
+instead of changing the process-wide `arcpy.env.workspace`.
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+import uuid
+
+
+def unique_name(prefix):
+    """Returns a name for a layer or in-memory dataset that no other run uses, e.g. join_lyr_1a2b3c4d5e6f."""
+
+    return "{0}_{1}".format(prefix, uuid.uuid4().hex[:12])
+
+
+@contextlib.contextmanager
+def scratch_folder(prefix="acstools_"):
+    """Creates a scratch folder for one run, which is removed with its contents when the run ends.
+
+    Yields:
+        str: Path of the folder.
+
+    """
+
+    path = tempfile.mkdtemp(prefix=prefix)
+
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def replace_file(tmp, path):
+    """Moves a finished temporary file into place, so that other runs never read a partly written file."""
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp, path)
+
+
+def temporary_path(path):
+    """Returns a temporary path next to `path`, unique to this run, with the same extension."""
+
+    root, ext = os.path.splitext(path)
+
+    return "{0}.{1}.tmp{2}".format(root, uuid.uuid4().hex[:12], ext)
@@ -0,0 +1,143 @@
+"""Compact field types for output tables.
+
+Output tables are converted from CSV files, and ArcGIS infers a field type for each column:
+usually DOUBLE for estimates, and long text fields for GEOID and Geography. Counts fit in far
+smaller fields. `field_types()` chooses the smallest type for each column: estimates and margins
+of error that the variable catalogue types as `int` get the smallest integer type that holds
+their values, and only `float` variables (e.g. ratios and some medians) and derived fields with
+fractional values are stored as DOUBLE. Text fields are sized to their longest value.
+
+The types are applied through the field mappings, from `field_mappings()`, used to create the
+output table.
+"""
+
+import re
+
+
+#: list: (ArcGIS field type, minimum, maximum) of the integer types, smallest first
+INTEGER_TYPES = [('SmallInteger', -2 ** 15, 2 ** 15 - 1), ('Integer', -2 ** 31, 2 ** 31 - 1)]
+
+#: re.Pattern: Output columns named `<var>_<year>`
+COLUMN = re.compile(r'^(\w+)_(\d{4})$')
+
+
+def predicate_type(column, survey='acs5'):
+    """Returns the catalogue predicateType ('int', 'float' or 'string') of a `<var>_<year>` column in a
+    survey ('acs5' or 'acs1'), or None for other columns (e.g. derived fields) and variables not in the catalogue."""
+
+    match = COLUMN.match(column)
+
+    if match is None:
+        return None
+
+    from acstools import catalog
+
+    try:
+        variables = catalog.variable_catalog(match.group(1), match.group(2), survey).variables
+    except Exception:
+        return None
+
+    return variables.get(match.group(1), {}).get('predicateType')
+
+
+def _integer_type(low, high):
+    for field_type, minimum, maximum in INTEGER_TYPES:
+        if minimum <= low and high <= maximum:
+            return field_type
+
+    return 'Double'
+
+
+def field_type(column, values=None, survey='acs5'):
+    """Returns the ArcGIS field type, and the length of text fields, for an output column.
+
+    Args:
+        column (str): Column name.
+        values (pandas.Series, optional): The column's values. If None (e.g. for partitioned output),
+            the type is chosen from the catalogue alone, and integers are given the Integer type.
+        survey (str, optional): 'acs5' or 'acs1', the survey whose catalogues are looked up.
+
+    Returns:
+        tuple: (field type, length), where length is None for numeric fields.
+
+    """
+
+    predicate = predicate_type(column, survey)
+
+    if values is None:
+        if predicate == 'int':
+            return 'Integer', None
+        if predicate == 'float':
+            return 'Double', None
+        return None, None
+
+    import pandas as pd
+
+    if not pd.api.types.is_numeric_dtype(values):
+        lengths = values.dropna().astype(str).str.len()
+        return 'String', max(int(lengths.max()) if len(lengths) else 1, 1)
+
+    x = values.dropna()
+
+    if predicate == 'float' or not (x == x.round()).all():
+        return 'Double', None
+
+    if len(x) == 0:
+        return 'Integer', None
+
+    return _integer_type(x.min(), x.max()), None
+
+
+def field_types(df, columns=None, survey='acs5'):
+    """Returns a dictionary of (field type, length) tuples for the columns of an output data frame,
+    including its index (e.g. GEOID).
+
+    Args:
+        df (pandas.DataFrame or None): Output data frame. If None, types are chosen from the catalogue alone.
+        columns (list, optional): Column names, required if `df` is None.
+        survey (str, optional): 'acs5' or 'acs1', the survey whose catalogues are looked up.
+
+    """
+
+    if df is None:
+        return {c: field_type(c, survey=survey) for c in columns}
+
+    types = {c: field_type(c, df[c], survey) for c in df.columns}
+
+    if df.index.name:
+        types[df.index.name] = field_type(df.index.name, df.index.to_series(), survey)
+
+    return types
+
+
+def field_mappings(in_table, field_list, field_types=None):
+    """Returns a field mappings object from an input table, which can be used to control the order,
+    selection, names and types of output fields.
+
+    Args:
+        in_table (str): Input table, either a spatial data table or standalone. Qualified field names
+            of joined tables (e.g. 'acs_table.GEOID') are written under their unqualified names.
+        field_list (list): [field name, alias] pairs of the output fields.
+        field_types (dict, optional): (field type, length) pairs by output field name, from `field_types()`.
+
+    """
+
+    import arcpy as ap
+
+    fms = ap.FieldMappings()
+
+    for name, alias in field_list:
+        fmap = ap.FieldMap()
+        fmap.addInputField(in_table, name)
+        out_f = fmap.outputField
+        out_f.name = name.split(".")[-1]
+        out_f.aliasName = alias
+        field_type, length = (field_types or {}).get(out_f.name, (None, None))
+        if field_type:
+            out_f.type = field_type
+        if length:
+            out_f.length = length
+        fmap.outputField = out_f
+        fms.addFieldMap(fmap)
+
+    return fms
@@ -0,0 +1,66 @@
+"""Memory-bounded output of large downloads, one geography partition at a time.
+
+`GetOutputTable` normally downloads every year for the whole selection, joins the years in
+memory and then writes the table. For block groups with margins of error over several years
+that can be more than a workstation's memory. In partitioned mode the selection is split into
+groups of counties, and each group is downloaded, joined, derived and appended to the output
+CSV before the next is started, so peak memory depends on the largest partition rather than on
+the size of the output.
+
+Row-wise steps (joining years, derived fields) give the same results per partition as for the
+whole selection. Steps that combine geographies across partitions (zone aggregation,
+interpolation) need the whole table, and are not available in partitioned mode.
+"""
+
+import gc
+import os
+
+
+def county_partitions(counties, size=1):
+    """Splits a list of county FIPS codes into partitions.
+
+    Args:
+        counties (list): County FIPS codes.
+        size (int, optional): Number of counties in each partition.
+
+    Returns:
+        list: Lists of county FIPS codes.
+
+    """
+
+    return [counties[i:i + size] for i in range(0, len(counties), size)]
+
+
+def stream_partitions(partitions, process, out_csv, columns, message=None):
+    """Processes partitions one at a time, appending each one's rows to a CSV file.
+
+    Args:
+        partitions (list): Partitions, e.g. from `county_partitions()`.
+        process (function): Function returning the output data frame for a partition.
+        out_csv (str): Output CSV file, which is overwritten.
+        columns (list): Output columns, in order. Every partition is written with these columns
+            (missing columns are left empty), so the rows line up under a single header.
+        message (function, optional): Function called with a progress message after each partition.
+
+    Returns:
+        int: Number of rows written.
+
+    """
+
+    rows = 0
+
+    if os.path.exists(out_csv):
+        os.remove(out_csv)
+
+    for i, partition in enumerate(partitions):
+        df = process(partition).reindex(columns=columns)
+        df.to_csv(out_csv, mode="a", header=(i == 0))
+        rows += len(df)
+
+        del df
+        gc.collect()
+
+        if message is not None:
+            message("Wrote partition {0} of {1} ({2} rows in total)".format(i + 1, len(partitions), rows))
+
+    return rows
@@ -0,0 +1,225 @@
+"""Aggregation of downloaded ACS data to custom planning zones.
+
+ACS estimates are only published for standard geographies, but planning work is done on traffic
+analysis zones, MPO areas and corridors. A `ZoneWeights` object holds a sparse GEOID-to-zone
+weight matrix W, in which each weight is the share of a tract's or block group's estimates that
+falls in a zone (by area, or by population from a finer layer such as census blocks). Zone
+estimates are then a single sparse matrix product, W' X, over all estimate columns at once, and
+margins of error are propagated with the ACS approximation for sums,
+
+    MOE(zone) = sqrt(sum((w * MOE) ** 2))
+
+computed as sqrt((W ** 2)' M ** 2).
+
+Weight matrices are built from a crosswalk table, or from geography and zone layers with ArcGIS,
+and cached in `CACHE_DIR` so they are only computed once.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from acstools import cache_path
+
+
+#: re.Pattern: Output columns holding margins of error (`<var>M_<year>`)
+MOE_COLUMN = re.compile(r'M_\d{4}$')
+
+
+def normalize_geoid(geoid):
+    """Returns the numeric part of a GEOID, so that API GEO_IDs (e.g. '1400000US47001020100') match
+    crosswalk and TIGER GEOIDs (e.g. '47001020100')."""
+
+    return str(geoid).split('US')[-1]
+
+
+class ZoneWeights:
+    """Sparse GEOID-to-zone weight matrix.
+
+    Args:
+        geoids (list): GEOIDs of the source geographies (matrix rows).
+        zones (list): Zone IDs (matrix columns).
+        matrix (scipy.sparse matrix): Weights, with one row per GEOID and one column per zone.
+
+    """
+
+    def __init__(self, geoids, zones, matrix):
+        self.geoids = [normalize_geoid(g) for g in geoids]
+        # Zone IDs are text, as they are when loaded from the cache, whatever the type of the zone field
+        self.zones = [str(z) for z in zones]
+        self.matrix = sparse.csr_matrix(matrix)
+        self._rows = {g: i for i, g in enumerate(self.geoids)}
+
+    @classmethod
+    def from_crosswalk(cls, crosswalk, geoid_field='GEOID', zone_field='ZONE', weight_field='WEIGHT'):
+        """Builds weights from a crosswalk data frame with one row per GEOID and zone pair.
+
+        Args:
+            crosswalk (pandas.DataFrame): Crosswalk table.
+            geoid_field (str, optional): Field containing GEOIDs.
+            zone_field (str, optional): Field containing zone IDs.
+            weight_field (str, optional): Field containing the share of the GEOID's estimates in the zone.
+
+        """
+
+        geoids = crosswalk[geoid_field].map(normalize_geoid)
+        geo_codes, geo_index = pd.factorize(geoids)
+        zone_codes, zone_index = pd.factorize(crosswalk[zone_field])
+        matrix = sparse.coo_matrix((crosswalk[weight_field].to_numpy(float), (geo_codes, zone_codes)),
+                                   shape=(len(geo_index), len(zone_index)))
+
+        # Duplicate GEOID and zone pairs are summed when converting to CSR
+        return cls(list(geo_index), list(zone_index), matrix.tocsr())
+
+    @classmethod
+    def from_table(cls, table, geoid_field='GEOID', zone_field='ZONE', weight_field='WEIGHT'):
+        """Builds weights from a crosswalk table (.csv file or ArcGIS table), using the cache when the
+        table hasn't changed since the weights were last built. Files are identified by their modification
+        time and size, and geodatabase tables by a fingerprint of their rows."""
+
+        if os.path.isfile(table):
+            stat = os.stat(table)
+            version = [stat.st_mtime, stat.st_size]
+        else:
+            from acstools.layers import table_fingerprint
+            version = [table_fingerprint(table, [geoid_field, zone_field, weight_field])]
+
+        path = cache_path('zones', os.path.abspath(table), *version, geoid_field, zone_field, weight_field)
+
+        if os.path.exists(path):
+            return cls.load(path)
+
+        if table.lower().endswith('.csv'):
+            crosswalk = pd.read_csv(table, dtype={geoid_field: str, zone_field: str})
+        else:
+            import arcpy as ap
+            crosswalk = pd.DataFrame(ap.da.TableToNumPyArray(table, [geoid_field, zone_field, weight_field]))
+
+        weights = cls.from_crosswalk(crosswalk, geoid_field, zone_field, weight_field)
+        weights.save(path)
+
+        return weights
+
+    @classmethod
+    def from_layers(cls, geo_features, geoid_field, zone_features, zone_field, weight_features=None, weight_field=None):
+        """Builds area- or population-weighted weights by overlaying geography and zone layers with ArcGIS.
+        Results are cached by the fingerprints of the layers' contents, so the overlay is only run again
+        when a layer changes.
+
+        Args:
+            geo_features (str): Tract or block group polygons.
+            geoid_field (str): GEOID field of `geo_features`.
+            zone_features (str): Zone polygons.
+            zone_field (str): Zone ID field of `zone_features`.
+            weight_features (str, optional): Features with population counts (e.g. census block points).
+                If None, weights are the share of each geography's area in each zone.
+            weight_field (str, optional): Population field of `weight_features`.
+
+        """
+
+        import arcpy as ap
+        from acstools.layers import ensure_spatial_index, layer_fingerprint
+        from acstools.runs import unique_name
+
+        path = cache_path('zones', layer_fingerprint(geo_features, geoid_field), layer_fingerprint(zone_features, zone_field),
+                          weight_features and layer_fingerprint(weight_features, weight_field), geoid_field, zone_field)
+
+        if os.path.exists(path):
+            return cls.load(path)
+
+        for features in [geo_features, zone_features, weight_features]:
+            if features is not None:
+                ensure_spatial_index(features)
+
+        out_table = 'memory\\' + unique_name('zone_weights')
+
+        # Overlay outputs rename a zone field with the same name as the GEOID field (e.g. GEOID to GEOID_1)
+        zone_output = zone_field + '_1' if zone_field.upper() == geoid_field.upper() else zone_field
+
+        if weight_features is None:
+            ap.analysis.TabulateIntersection(geo_features, geoid_field, zone_features, out_table, zone_field)
+            crosswalk = pd.DataFrame(ap.da.TableToNumPyArray(out_table, [geoid_field, zone_output, 'PERCENTAGE']))
+            crosswalk.columns = ['GEOID', 'ZONE', 'PERCENTAGE']
+            crosswalk['WEIGHT'] = crosswalk['PERCENTAGE'] / 100
+
+        else:
+            pieces = 'memory\\' + unique_name('zone_pieces')
+            ap.analysis.Intersect([geo_features, zone_features], pieces)
+            ap.analysis.TabulateIntersection(pieces, [geoid_field, zone_output], weight_features, out_table,
+                                             None, weight_field)
+            crosswalk = pd.DataFrame(ap.da.TableToNumPyArray(out_table, [geoid_field, zone_output, weight_field]))
+            crosswalk.columns = ['GEOID', 'ZONE', 'POPULATION']
+            totals = crosswalk.groupby('GEOID')['POPULATION'].transform('sum')
+            crosswalk['WEIGHT'] = (crosswalk['POPULATION'] / totals.where(totals > 0)).fillna(0)
+            ap.management.Delete(pieces)
+
+        ap.management.Delete(out_table)
+
+        weights = cls.from_crosswalk(crosswalk)
+        weights.save(path)
+
+        return weights
+
+    def save(self, path):
+        """Saves the weights to a .npz file. The file is written under a temporary name and then
+        moved into place, so runs sharing the cache never load a partly written file."""
+
+        from acstools.runs import replace_file, temporary_path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        m = self.matrix
+        tmp = temporary_path(path)
+        np.savez_compressed(tmp, data=m.data, indices=m.indices, indptr=m.indptr, shape=m.shape,
+                            geoids=np.array(self.geoids), zones=np.array(self.zones))
+        replace_file(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads weights saved with `save()`."""
+
+        with np.load(path) as f:
+            matrix = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+            return cls(list(f['geoids']), list(f['zones']), matrix)
+
+    def _align(self, df):
+        """Returns the weight rows matching the rows of a data frame indexed by GEOID."""
+
+        rows = np.array([self._rows.get(normalize_geoid(g), -1) for g in df.index])
+        found = rows >= 0
+        select = sparse.csr_matrix((np.ones(found.sum()), (np.flatnonzero(found), rows[found])),
+                                   shape=(len(df), len(self.geoids)))
+
+        return select @ self.matrix
+
+    def aggregate(self, df, zone_field='ZONE'):
+        """Aggregates a GetOutputTable data frame (indexed by GEOID) to zones.
+
+        Estimate columns are summed with the zone weights, and margin of error columns (`<var>M_<year>`)
+        are combined with the ACS sum-of-squares approximation. Other columns (e.g. Geography) are dropped.
+        Negative values (the API's annotation codes for unavailable estimates) are treated as zero.
+        Weighted sums only make sense for counts; medians and ratios should be derived from aggregated counts.
+
+        Returns:
+            pandas.DataFrame: Data frame with one row per zone, indexed by `zone_field`.
+
+        """
+
+        columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        moes = [c for c in columns if MOE_COLUMN.search(c)]
+        estimates = [c for c in columns if c not in moes]
+
+        weights = self._align(df)
+        out = pd.DataFrame(index=pd.Index(self.zones, name=zone_field))
+
+        if estimates:
+            x = np.clip(np.nan_to_num(df[estimates].to_numpy(float)), 0, None)
+            out[estimates] = weights.T @ x
+
+        if moes:
+            m = np.clip(np.nan_to_num(df[moes].to_numpy(float)), 0, None)
+            out[moes] = np.sqrt(weights.power(2).T @ (m ** 2))
+
+        return out[columns]
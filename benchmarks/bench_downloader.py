@@ -0,0 +1,246 @@
+"""End-to-end benchmarks of the ACS Data Downloader against the mock Census API.
+
+Drives `download`, `DownloadTable` and `GetOutputTable` through a local `MockCensusServer`
+for county, tract and block group geographies, single- and multi-year requests, and all
+counties or a chosen set of counties. Each scenario is repeated and reported with its
+throughput (requests and rows per second) and request and run latency percentiles.
+
+`DownloadTable` and `GetOutputTable` are loaded from the US ACS Data Downloader script, and
+are skipped when it can't be imported (e.g. outside the ArcGIS Pro Python environment).
+`GetOutputTable` scenarios write .csv outputs to a temporary folder.
+
+Usage:
+    python bench_downloader.py --repeat 5 --latency 0.05 --jitter 0.02 --error-rate 0.01
+    python bench_downloader.py --recordings recordings --json results.json
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acstools import census
+from mock_census import MockCensusServer, Synthesizer
+
+
+#: str: Path of the script providing `DownloadTable` and `GetOutputTable`
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'US ACS Data Downloader.py')
+
+#: dict: Geography clauses for the `download` scenarios, by tool geography
+GEO_ARGS = {'County': [], 'Tract': [('tract', '*')], 'Block group': [('block group', '*')]}
+
+
+def load_script(path=SCRIPT):
+    """Imports a downloader script as a module, returning None if it can't be imported."""
+
+    spec = importlib.util.spec_from_file_location('downloader', path)
+    module = importlib.util.module_from_spec(spec)
+
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        print('Skipping DownloadTable and GetOutputTable scenarios: {0}'.format(e))
+        return None
+
+    return module
+
+
+def percentile(values, pct):
+    """Returns the nearest-rank percentile of a list of values."""
+
+    if not values:
+        return float('nan')
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, max(0, int(round(pct / 100 * len(values) + 0.5)) - 1))]
+
+
+class RequestTimer:
+    """Records the latency of every HTTP request made through `requests` while active."""
+
+    def __init__(self):
+        self.latencies = []
+        self.lock = threading.Lock()
+        self._request = requests.sessions.Session.request
+
+    def __enter__(self):
+        timer = self
+        request = self._request
+
+        def timed(session, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return request(session, *args, **kwargs)
+            finally:
+                with timer.lock:
+                    timer.latencies.append(time.perf_counter() - start)
+
+        requests.sessions.Session.request = timed
+
+        return self
+
+    def __exit__(self, *exc):
+        requests.sessions.Session.request = self._request
+
+
+def scenarios(fields, state, counties):
+    """Returns the benchmark scenario matrix.
+
+    Args:
+        fields (list): Estimate variables requested in each scenario.
+        state (str): State name.
+        counties (list): County FIPS codes used in chosen-county scenarios."""
+
+    out = []
+
+    for func, geo, years, chosen in itertools.product(
+            ['download', 'DownloadTable', 'GetOutputTable'],
+            ['County', 'Tract', 'Block group'],
+            [[2021], [2019, 2020, 2021]],
+            [False, True]):
+
+        out.append({
+            'name': '{0} {1} {2} {3}'.format(func, geo.lower(), '-'.join(str(y) for y in (years[0], years[-1]))
+                                             if len(years) > 1 else years[0], 'chosen' if chosen else 'all'),
+            'func': func, 'geo': geo, 'years': years, 'state': state,
+            'counties': counties if chosen else "'All counties'", 'fields': fields})
+
+    return out
+
+
+def run_scenario(scenario, script, outdir):
+    """Runs a scenario once and returns the number of rows produced."""
+
+    fields, geo, years, counties = scenario['fields'], scenario['geo'], scenario['years'], scenario['counties']
+
+    if scenario['func'] == 'download':
+        statenum = script.GetStateNum(scenario['state'], years[-1]) if script else census.geographies(
+            census.censusgeo([('state', '*')]), years[-1])[scenario['state']].geo[0][1]
+        rows = 0
+
+        for year in years:
+            for county in (['*'] if counties == "'All counties'" else counties):
+                geo_arg = census.censusgeo([('state', statenum), ('county', county)] + GEO_ARGS[geo])
+                rows += len(census.download(year, geo_arg, ['GEO_ID'] + fields))
+
+        return rows
+
+    elif scenario['func'] == 'DownloadTable':
+        statenum = script.GetStateNum(scenario['state'], years[-1])
+
+        return sum(len(script.DownloadTable(year, statenum, fields, counties, geo)) for year in years)
+
+    out_table = os.path.join(outdir, scenario['name'].replace(' ', '_') + '.csv')
+
+    if len(years) == 1:
+        script.GetOutputTable(fields[0].split('_')[0], 'All fields', [], years[0], scenario['state'], counties,
+                              geo, out_table, 'false')
+    else:
+        output_fields = ["'{0}' '{0} ({1})'".format(f, y) for y in years for f in fields]
+        script.GetOutputTable('', 'From field list', output_fields, years[-1], scenario['state'], counties,
+                              geo, out_table, 'false')
+
+    with open(out_table) as f:
+        return sum(1 for line in f) - 1
+
+
+def benchmark(scenario, script, outdir, repeat):
+    """Runs a scenario `repeat` times and returns its summary statistics."""
+
+    runs, failures, rows = [], 0, 0
+
+    with RequestTimer() as timer:
+        for i in range(repeat):
+            start = time.perf_counter()
+            try:
+                rows += run_scenario(scenario, script, outdir)
+            except (ValueError, KeyError):
+                failures += 1
+                continue
+            runs.append(time.perf_counter() - start)
+
+    elapsed = sum(runs)
+
+    return {
+        'scenario': scenario['name'],
+        'runs': len(runs),
+        'failures': failures,
+        'requests': len(timer.latencies),
+        'rows': rows,
+        'requests_per_s': len(timer.latencies) / elapsed if elapsed else float('nan'),
+        'rows_per_s': rows / elapsed if elapsed else float('nan'),
+        'request_p50_ms': percentile(timer.latencies, 50) * 1000,
+        'request_p90_ms': percentile(timer.latencies, 90) * 1000,
+        'request_p99_ms': percentile(timer.latencies, 99) * 1000,
+        'run_p50_s': percentile(runs, 50),
+        'run_p90_s': percentile(runs, 90),
+        'run_max_s': max(runs) if runs else float('nan')}
+
+
+def report(results):
+    """Prints benchmark results as a table."""
+
+    columns = ['scenario', 'runs', 'failures', 'requests', 'requests_per_s', 'rows_per_s',
+               'request_p50_ms', 'request_p90_ms', 'request_p99_ms', 'run_p50_s', 'run_p90_s']
+    widths = [max(len(c), 42 if c == 'scenario' else 0) for c in columns]
+
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+
+    for r in results:
+        print('  '.join((str(r[c]) if isinstance(r[c], (str, int)) else '{0:.2f}'.format(r[c])).ljust(w)
+                        for c, w in zip(columns, widths)))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario')
+    parser.add_argument('--filter', default='', help='only run scenarios whose name contains this text')
+    parser.add_argument('--state', default='Tennessee')
+    parser.add_argument('--counties', default='001,003,005', help='comma-separated county FIPS codes')
+    parser.add_argument('--fields', type=int, default=20, help='number of B01001 estimates requested')
+    parser.add_argument('--recordings', help='folder of recorded responses to replay')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    server = MockCensusServer(args.recordings, args.latency, args.jitter, args.error_rate,
+                              synthesizer=Synthesizer(), seed=args.seed)
+    census.BASEURL = server.start()
+
+    script = load_script()
+    fields = ['B01001_{0:03d}E'.format(i + 1) for i in range(min(args.fields, 49))]
+    results = []
+
+    try:
+        with tempfile.TemporaryDirectory() as outdir:
+            for scenario in scenarios(fields, args.state, args.counties.split(',')):
+                if args.filter not in scenario['name'] or (scenario['func'] != 'download' and script is None):
+                    continue
+                results.append(benchmark(scenario, script, outdir, args.repeat))
+    finally:
+        server.stop()
+
+    report(results)
+    print('Mock server: ' + json.dumps(server.stats))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results, 'server': server.stats}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Scaling benchmarks of the Python-side download pipeline on synthetic data.
+
+Times each stage between the API response and the output file over a grid of row counts
+(geographies) and column counts (variables), and records the peak memory each stage allocates:
+
+    transpose         `_todict`, the row-to-column transpose in `_download`
+    coerce            `_coerce`, the per-cell int/float conversion in `download`
+    geoindex          `_geoindex`, the censusgeo index construction in `download`
+    frame             `_frame`, all of the above plus building the data frame
+    concat_counties   combining per-county frames, as in `DownloadTable`
+    append_counties   the same with `DataFrame.append` (only on pandas versions that have it)
+    join_years        the multi-year outer join chain in `GetOutputTable`
+    to_csv            writing the joined output to CSV
+
+For every stage the scaling exponent between consecutive row counts is reported (1 is linear,
+2 is quadratic), and stages that grow faster than `--threshold` are flagged.
+
+Usage:
+    python bench_pipeline.py --rows 1000,10000,100000,1000000 --cols 10,100,1000
+    python bench_pipeline.py --stages frame,join_years --json results.json
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acstools import census
+import synthetic
+
+
+#: int: Number of years joined in the join_years stage
+YEARS = 3
+
+#: int: Number of block groups per county in the county stages
+COUNTY_ROWS = 400
+
+
+def join_years(frames):
+    """Joins per-year frames the way `GetOutputTable` does for multi-year selections."""
+
+    join_df = frames[0]
+
+    for df in frames[1:]:
+        join_df = join_df.join(df.drop('Geography', axis=1), how='outer')
+
+    return join_df
+
+
+def append_counties(frames):
+    """Combines per-county frames with repeated `DataFrame.append`."""
+
+    acs_df = pd.DataFrame(columns=frames[0].columns)
+
+    for df in frames:
+        acs_df = acs_df.append(df)
+
+    return acs_df
+
+
+def stages(rows, cols, outdir):
+    """Returns (stage name, function) pairs for one grid size, with their inputs prepared."""
+
+    data = synthetic.response(rows, cols)
+    var = synthetic.variables(cols)
+    columns = census._todict(data)
+    geodata = {k: v for k, v in columns.items() if k not in var and k != 'GEO_ID'}
+    frames = [synthetic.frame(rows, cols, 2019 + i, seed=i) for i in range(YEARS)]
+    counties = [frames[0].iloc[i:i + COUNTY_ROWS] for i in range(0, rows, COUNTY_ROWS)]
+    joined = join_years(frames)
+    out_csv = os.path.join(outdir, 'out.csv')
+
+    out = [
+        ('transpose', lambda: census._todict(data)),
+        ('coerce', lambda: [census._coerce(columns[v]) for v in var]),
+        ('geoindex', lambda: census._geoindex(geodata)),
+        ('frame', lambda: census._frame(columns, var)),
+        ('concat_counties', lambda: pd.concat(counties)),
+        ('join_years', lambda: join_years(frames)),
+        ('to_csv', lambda: joined.to_csv(out_csv))]
+
+    if hasattr(pd.DataFrame, 'append'):
+        out.insert(5, ('append_counties', lambda: append_counties(counties)))
+
+    return out
+
+
+def measure(func, repeat):
+    """Returns the best time in seconds over `repeat` calls, and the peak memory of one call in MB."""
+
+    times = []
+
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(times), peak / 2 ** 20
+
+
+def exponents(results, threshold):
+    """Returns the scaling exponent of every stage between consecutive row counts, per column count."""
+
+    out = []
+    keyed = {}
+
+    for r in results:
+        keyed.setdefault((r['stage'], r['cols']), []).append(r)
+
+    for (stage, cols), rs in keyed.items():
+        rs.sort(key=lambda r: r['rows'])
+
+        for a, b in zip(rs, rs[1:]):
+            if a['seconds'] > 0:
+                exp = math.log(b['seconds'] / a['seconds']) / math.log(b['rows'] / a['rows'])
+                out.append({'stage': stage, 'cols': cols, 'rows': '{0}-{1}'.format(a['rows'], b['rows']),
+                            'exponent': exp, 'flagged': exp > threshold})
+
+    return out
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', default='1000,10000,100000', help='comma-separated row counts')
+    parser.add_argument('--cols', default='10,100,1000', help='comma-separated column counts')
+    parser.add_argument('--max-cells', type=float, default=2e7, help='skip grid sizes with more rows x cols')
+    parser.add_argument('--stages', default='', help='comma-separated stages to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed calls per stage; the best is reported')
+    parser.add_argument('--threshold', type=float, default=1.3, help='flag scaling exponents above this')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    selected = [s for s in args.stages.split(',') if s]
+    results = []
+
+    print('{0:<16}{1:>9}{2:>7}{3:>12}{4:>12}'.format('stage', 'rows', 'cols', 'seconds', 'peak MB'))
+
+    with tempfile.TemporaryDirectory() as outdir:
+        for cols in [int(c) for c in args.cols.split(',')]:
+            for rows in [int(r) for r in args.rows.split(',')]:
+                if rows * cols > args.max_cells:
+                    print('{0:<16}{1:>9}{2:>7}  skipped (over --max-cells)'.format('*', rows, cols))
+                    continue
+
+                for stage, func in stages(rows, cols, outdir):
+                    if selected and stage not in selected:
+                        continue
+                    seconds, peak = measure(func, args.repeat)
+                    results.append({'stage': stage, 'rows': rows, 'cols': cols, 'seconds': seconds, 'peak_mb': peak})
+                    print('{0:<16}{1:>9}{2:>7}{3:>12.4f}{4:>12.1f}'.format(stage, rows, cols, seconds, peak))
+
+    scaling = exponents(results, args.threshold)
+
+    print('\nScaling exponents by row count (1 = linear, 2 = quadratic)')
+
+    for s in scaling:
+        print('{0:<16}{1:>7} cols {2:>16} rows {3:>6.2f}{4}'.format(
+            s['stage'], s['cols'], s['rows'], s['exponent'], '  SUPERLINEAR' if s['flagged'] else ''))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results, 'scaling': scaling}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
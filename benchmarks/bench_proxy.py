@@ -0,0 +1,91 @@
+"""Benchmark of the caching proxy in front of the mock Census API.
+
+Starts a `MockCensusServer` as the upstream API and an `acstools.proxy.CensusProxy` in front of
+it, then simulates a team of analysts: each round, every analyst sends the same set of data
+requests at once, with the request engine. Reports the wall time of
+each round, the number of requests that reached the upstream API, and the proxy's hit rate.
+The first round shows in-flight deduplication, the later rounds cache hits.
+
+Usage:
+    python bench_proxy.py --analysts 8 --requests 20 --rounds 3 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acstools.engine import CensusEngine, run
+from acstools.proxy import CensusProxy
+from mock_census import MockCensusServer, Synthesizer
+
+
+def requests_for(count, year=2019):
+    """Returns `count` distinct data requests, one per county of Tennessee, as (year, params) pairs."""
+
+    return [(year, {'get': 'NAME,GEO_ID,B01001_001E', 'for': 'tract:*', 'in': 'state:47 county:{0:03d}'.format(2 * i + 1)})
+            for i in range(count)]
+
+
+async def analyst(engine, calls):
+    """Requests the same data as every other analyst."""
+
+    return [await engine.fetch(year, params) for year, params in calls]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--analysts', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=20, help='distinct data requests per client')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.2, help='upstream seconds per response')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    upstream = MockCensusServer(latency=args.latency, synthesizer=Synthesizer(counties=2 * args.requests))
+    upstream.start()
+    results = []
+
+    with tempfile.TemporaryDirectory() as cache:
+        proxy = CensusProxy('http://{0}:{1}'.format(*upstream.httpd.server_address[:2]), cache, port=0)
+        proxy.start()
+        calls = requests_for(args.requests)
+
+        async def team(engine):
+            return await asyncio.gather(*[analyst(engine, calls) for i in range(args.analysts)])
+
+        try:
+            print('{0:<8}{1:>10}{2:>18}{3:>20}{4:>10}'.format('round', 'seconds', 'client requests', 'upstream requests', 'hit rate'))
+
+            for r in range(args.rounds):
+                before = upstream.stats['requests']
+                start = time.perf_counter()
+
+                with CensusEngine(args.analysts * 4, proxy.baseurl) as engine:
+                    run(team(engine))
+
+                seconds = time.perf_counter() - start
+                summary = proxy.summary()
+                results.append({'round': r + 1, 'seconds': seconds, 'client_requests': args.analysts * len(calls),
+                                'upstream_requests': upstream.stats['requests'] - before, 'proxy': summary})
+                print('{0:<8}{1:>10.2f}{2:>18}{3:>20}{4:>10.2f}'.format(
+                    r + 1, seconds, args.analysts * len(calls), upstream.stats['requests'] - before, summary['hit_rate']))
+        finally:
+            proxy.stop()
+            upstream.stop()
+
+    print('Proxy: ' + json.dumps(proxy.summary()))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Startup and validation latency benchmarks.
+
+Measures what the toolbox pays before any download starts: the time to import the modules
+used by the tool validator and the tool scripts, each in a fresh Python process, and the time
+to re-validate (parse Output Fields and search a loaded variable catalogue) once they are
+imported. Imports that load pandas or requests are reported, since the validator path should
+load neither.
+
+The scripts are skipped when arcpy can't be imported (e.g. outside the ArcGIS Pro Python
+environment).
+
+Usage:
+    python bench_startup.py --repeat 10
+    python bench_startup.py --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acstools import params
+from acstools.catalog import Catalog
+from mock_census import Synthesizer
+
+
+#: str: Repository folder, the working directory of each import process
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#: list: (name, import statement) pairs timed in fresh processes
+IMPORTS = [
+    ('validator (params, catalog)', 'from acstools import params, catalog'),
+    ('census', 'from acstools import census'),
+    ('planner', 'from acstools import planner'),
+    ('derived', 'from acstools import derived'),
+    ('zones', 'from acstools import zones'),
+    ('US ACS Data Downloader.py', "import runpy; runpy.run_path('US ACS Data Downloader.py')"),
+    ('TN ACS Data Downloader.py', "import runpy; runpy.run_path('TN ACS Data Downloader.py')")]
+
+#: str: Code run in each import process, printing the import time and the heavy modules loaded
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{0}
+print(json.dumps([time.perf_counter() - start, [m for m in ('pandas', 'requests', 'scipy') if m in sys.modules]]))
+"""
+
+
+def time_import(statement, repeat):
+    """Returns the median import time in seconds over `repeat` fresh processes, and the heavy modules
+    loaded, or None if the import fails."""
+
+    times = []
+
+    for i in range(repeat):
+        p = subprocess.run([sys.executable, '-c', PROBE.format(statement)], cwd=ROOT, capture_output=True, text=True)
+        if p.returncode != 0:
+            return None
+        seconds, loaded = json.loads(p.stdout.strip().splitlines()[-1])
+        times.append(seconds)
+
+    return statistics.median(times), loaded
+
+
+def time_call(func, repeat):
+    """Returns the median time of a call in seconds."""
+
+    times = []
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement; the median is reported')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = []
+
+    print('{0:<32}{1:>12}  {2}'.format('import', 'ms', 'heavy modules loaded'))
+
+    for name, statement in IMPORTS:
+        timed = time_import(statement, args.repeat)
+        if timed is None:
+            print('{0:<32}  skipped (import failed)'.format(name))
+            continue
+        results.append({'measure': 'import', 'name': name, 'ms': timed[0] * 1000, 'loaded': timed[1]})
+        print('{0:<32}{1:>12.1f}  {2}'.format(name, timed[0] * 1000, ', '.join(timed[1]) or '-'))
+
+    output_fields = ["'Total' 'B01001_{0:03d}E ({1})'".format(i + 1, 2015 + i % 5) for i in range(50)]
+    text = ';'.join(output_fields)
+    cat = Catalog(2019, Synthesizer().variables()['variables'])
+
+    calls = [
+        ('parse Output Fields', lambda: params.parse_output_fields(output_fields)),
+        ('Output Fields years', lambda: params.output_years(text)),
+        ('search tables', lambda: cat.search_tables('sex by age')),
+        ('field list', lambda: cat.field_list('B01001'))]
+
+    print('\n{0:<32}{1:>12}'.format('validation (loaded catalogue)', 'ms'))
+
+    for name, func in calls:
+        ms = time_call(func, args.repeat) * 1000
+        results.append({'measure': 'validation', 'name': name, 'ms': ms})
+        print('{0:<32}{1:>12.3f}'.format(name, ms))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Check that interpolated output is the same whether the overlay weights were just built or cached.
+
+`ZoneWeights.from_layers` builds the weights on the first run and loads them from the cache on
+later runs, so the two paths must give identical output: the same values, the same target IDs
+(as text, even for a numeric Target ID Field) and the same field types. The overlay itself needs
+ArcGIS, so this check builds the weights from a crosswalk shaped like the overlay's output, with
+numeric target IDs, then saves and reloads them as the cache does.
+
+Usage:
+    python check_interpolation.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acstools.interpolation import interpolate
+from acstools.schema import field_types
+from acstools.zones import ZoneWeights, normalize_geoid
+
+
+def source_frame(tracts=20, seed=0):
+    """Returns a GetOutputTable-like data frame of estimates and margins of error for 2010 tracts."""
+
+    rng = np.random.default_rng(seed)
+    geoids = ['1400000US47001{0:04d}00'.format(i + 1) for i in range(tracts)]
+    df = pd.DataFrame({'Geography': ['Tract {0}'.format(i + 1) for i in range(tracts)],
+                       'X_2019': rng.integers(100, 5000, tracts), 'XM_2019': rng.integers(10, 500, tracts)},
+                      index=pd.Index(geoids, name='GEOID'))
+
+    return df
+
+
+def overlay(tracts=20, targets=6, seed=0):
+    """Returns a crosswalk like the overlay output: source GEOIDs, numeric target IDs and area shares."""
+
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for i in range(tracts):
+        split = sorted(rng.choice(targets, 2, replace=False) + 1000)
+        share = rng.uniform(0.2, 0.8)
+        geoid = '47001{0:04d}00'.format(i + 1)
+        rows += [(geoid, split[0], share), (geoid, split[1], 1 - share)]
+
+    return pd.DataFrame(rows, columns=['GEOID', 'ZONE', 'WEIGHT'])
+
+
+def run(weights, df, other):
+    """Interpolates a year and joins a year already on the target polygons, as GetOutputTable does."""
+
+    out = interpolate(df, weights).join(other.drop(columns='Geography'), how='outer')
+
+    return out, field_types(out)
+
+
+def main():
+
+    df = source_frame()
+    crosswalk = overlay()
+    built = ZoneWeights.from_crosswalk(crosswalk)
+
+    # A year already on the target polygons, indexed by their IDs as text
+    other = pd.DataFrame({'Geography': built.zones, 'Y_2021': range(len(built.zones))},
+                         index=pd.Index(built.zones, name='GEOID'))
+    other.index = other.index.map(normalize_geoid)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'weights.npz')
+        built.save(path)
+        cached = ZoneWeights.load(path)
+
+    first, first_types = run(built, df, other)
+    second, second_types = run(cached, df, other)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first_types == second_types, (first_types, second_types)
+    assert first['Y_2021'].notna().all(), 'target IDs did not match the joined year'
+    assert first_types['GEOID'][0] == 'String', first_types['GEOID']
+
+    print('Interpolation matches between built and cached weights: {0} targets, GEOID {1}'.format(
+        len(first), first_types['GEOID']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""Local stand-in for the Census Data API, used to benchmark the downloaders reproducibly.
+
+The server replays recorded responses (variables.json catalogues, geography lists and data
+requests) from a recordings folder. Requests that have no recording can either be recorded from
+a live upstream API (record mode) or synthesized from the request itself, so benchmark scenarios
+run without network access. Every response can be delayed by a fixed latency plus random jitter,
+and a configurable share of requests fail with an HTTP 500, mimicking an overloaded API.
+
+Usage:
+    python mock_census.py --port 8765 --recordings recordings --latency 0.05 --error-rate 0.01
+    python mock_census.py --recordings recordings --record https://api.census.gov
+
+Point the downloaders at the server by setting CENSUS_API_BASEURL=http://127.0.0.1:8765/data/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import sys
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acstools.proxy import request_key
+
+
+#: dict: State FIPS codes by name, used for synthesized state geographies
+STATES = {
+    'Alabama': '01', 'Alaska': '02', 'Arizona': '04', 'Arkansas': '05', 'California': '06', 'Colorado': '08',
+    'Connecticut': '09', 'Delaware': '10', 'District of Columbia': '11', 'Florida': '12', 'Georgia': '13',
+    'Hawaii': '15', 'Idaho': '16', 'Illinois': '17', 'Indiana': '18', 'Iowa': '19', 'Kansas': '20',
+    'Kentucky': '21', 'Louisiana': '22', 'Maine': '23', 'Maryland': '24', 'Massachusetts': '25',
+    'Michigan': '26', 'Minnesota': '27', 'Mississippi': '28', 'Missouri': '29', 'Montana': '30',
+    'Nebraska': '31', 'Nevada': '32', 'New Hampshire': '33', 'New Jersey': '34', 'New Mexico': '35',
+    'New York': '36', 'North Carolina': '37', 'North Dakota': '38', 'Ohio': '39', 'Oklahoma': '40',
+    'Oregon': '41', 'Pennsylvania': '42', 'Rhode Island': '44', 'South Carolina': '45', 'South Dakota': '46',
+    'Tennessee': '47', 'Texas': '48', 'Utah': '49', 'Vermont': '50', 'Virginia': '51', 'Washington': '53',
+    'West Virginia': '54', 'Wisconsin': '55', 'Wyoming': '56', 'Puerto Rico': '72'}
+
+#: dict: Tables included in the synthesized variable catalogue, as table ID: (concept, number of estimates)
+TABLES = {
+    'B01001': ('SEX BY AGE', 49),
+    'B01003': ('TOTAL POPULATION', 1),
+    'B08301': ('MEANS OF TRANSPORTATION TO WORK', 21),
+    'B19013': ('MEDIAN HOUSEHOLD INCOME IN THE PAST 12 MONTHS', 1),
+    'B25044': ('TENURE BY VEHICLES AVAILABLE', 15)}
+
+#: dict: Tables of the subject, data profile and comparison profile catalogues, as table ID: (concept, number of estimates)
+DATASET_TABLES = {
+    'subject': {'S0801': ('COMMUTING CHARACTERISTICS BY SEX', 12)},
+    'profile': {'DP03': ('SELECTED ECONOMIC CHARACTERISTICS', 30)},
+    'cprofile': {'CP03': ('COMPARATIVE ECONOMIC CHARACTERISTICS', 30)}}
+
+#: dict: Summary level codes for synthesized GEO_ID values
+SUMLEVELS = {'state': '040', 'county': '050', 'tract': '140', 'block group': '150'}
+
+
+def recording_path(recordings, key):
+    """Returns the file path used to store the recorded response for a request key."""
+
+    return os.path.join(recordings, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def parse_query(query):
+    """Splits a raw Census API query string into a dictionary, keeping '+' separators as spaces."""
+
+    params = {}
+
+    for part in query.split('&'):
+        if '=' in part:
+            k, v = part.split('=', 1)
+            params[k] = urllib.request.unquote(v).replace('+', ' ')
+
+    return params
+
+
+class Synthesizer:
+    """Generates plausible Census API responses for requests without a recording.
+
+    Args:
+        counties (int, optional): Number of counties generated per state.
+        tracts (int, optional): Number of tracts generated per county.
+        block_groups (int, optional): Number of block groups generated per tract.
+        filler_tables (int, optional): Number of extra tables added to the catalogue, so that
+            catalogue downloads and searches have a realistic size (the 5-year detail catalogue
+            holds roughly 27,000 variables)."""
+
+    def __init__(self, counties=20, tracts=10, block_groups=3, filler_tables=1000):
+        self.counties = counties
+        self.tracts = tracts
+        self.block_groups = block_groups
+        self.filler_tables = filler_tables
+
+    def variables(self, tabletype='detail'):
+        """Returns a variables.json document for a table type ('detail', 'subject', 'profile' or 'cprofile')."""
+
+        if tabletype in DATASET_TABLES:
+            tables = dict(DATASET_TABLES[tabletype])
+        else:
+            tables = dict(TABLES)
+            for i in range(self.filler_tables):
+                tables['B9{0:04d}'.format(i)] = ('SYNTHETIC TABLE {0}'.format(i), 25)
+
+        # Variables are numbered like those of each table type, e.g. S0801_C01_001E and DP03_0001E
+        pattern = {'subject': '{0}_C01_{1:03d}{2}', 'profile': '{0}_{1:04d}{2}', 'cprofile': '{0}_{1:04d}{2}'}.get(
+            tabletype, '{0}_{1:03d}{2}')
+        allvars = {}
+
+        for table, (concept, count) in tables.items():
+            for i in range(1, count + 1):
+                for suffix, label in (('E', 'Estimate'), ('M', 'Margin of Error')):
+                    name = pattern.format(table, i, suffix)
+                    allvars[name] = {
+                        'label': '{0}!!Total:!!Item {1}'.format(label, i),
+                        'concept': concept,
+                        'predicateType': 'int',
+                        'group': table}
+
+        return {'variables': allvars}
+
+    def codes(self, component, parent):
+        """Returns the codes of a geographic component within a parent geography."""
+
+        if component == 'state':
+            return sorted(STATES.values())
+        elif component == 'county':
+            return ['{0:03d}'.format(2 * i + 1) for i in range(self.counties)]
+        elif component == 'tract':
+            return ['{0:04d}00'.format(i + 1) for i in range(self.tracts)]
+        elif component == 'block group':
+            return [str(i + 1) for i in range(self.block_groups)]
+
+        raise ValueError('Unsupported geography: {0}'.format(component))
+
+    def geographies(self, params):
+        """Expands the 'for' and 'in' clauses of a request into a list of geographies.
+
+        Returns:
+            list: List of geographies, each a list of (component, code) pairs from the top down."""
+
+        clauses = dict(c.lower().rsplit(':', 1) for c in params.get('in', '').split(' ') + [params['for']] if c)
+        target = params['for'].lower().rsplit(':', 1)[0]
+        hierarchy = ['state', 'county', 'tract', 'block group']
+        geos = [[]]
+
+        # Levels left out of the request (e.g. the tract of a block group) are still returned by the API
+        for component in hierarchy[:hierarchy.index(target) + 1]:
+            codes = clauses.get(component, '*')
+            expanded = []
+
+            for geo in geos:
+                values = self.codes(component, geo) if codes == '*' else codes.split(',')
+                expanded.extend(geo + [(component, value)] for value in values)
+
+            geos = expanded
+
+        return geos
+
+    def name(self, geo):
+        """Returns a NAME value for a geography."""
+
+        names = {'state': lambda c: {v: k for k, v in STATES.items()}.get(c, 'State ' + c),
+                 'county': lambda c: 'C' + c + ' County',
+                 'tract': lambda c: 'Census Tract ' + str(int(c) / 100).rstrip('0').rstrip('.'),
+                 'block group': lambda c: 'Block Group ' + c}
+
+        return ', '.join(names[component](code) for component, code in reversed(geo))
+
+    def value(self, var, geo):
+        """Returns a deterministic value for a variable and geography."""
+
+        if var == 'NAME':
+            return self.name(geo)
+        elif var == 'GEO_ID':
+            return SUMLEVELS[geo[-1][0]] + '0000US' + ''.join(code for component, code in geo)
+
+        digest = hashlib.md5((var + ''.join(code for component, code in geo)).encode('utf-8')).digest()
+
+        return str(int.from_bytes(digest[:3], 'little') % 5000)
+
+    def data(self, params):
+        """Returns a data response: a header row followed by one row per geography."""
+
+        var = params['get'].split(',')
+        geos = self.geographies(params)
+
+        header = var + [component for component, code in geos[0]] if geos else var
+
+        return [header] + [[self.value(v, geo) for v in var] + [code for component, code in geo] for geo in geos]
+
+    def respond(self, path, params):
+        """Returns a (status, body) tuple for a request."""
+
+        if path.endswith('/variables.json'):
+            # e.g. /data/2019/acs/acs5/subject/variables.json
+            parts = path.split('/')
+            return 200, json.dumps(self.variables(parts[5] if len(parts) > 6 else 'detail'))
+        elif 'get' in params and 'for' in params:
+            return 200, json.dumps(self.data(params))
+
+        return 200, json.dumps({'dataset': [{'c_vintage': path.split('/')[2]}]})
+
+
+class MockCensusServer:
+    """Threaded HTTP server replaying recorded Census API responses.
+
+    Args:
+        recordings (str, optional): Folder containing recorded responses.
+        latency (float, optional): Seconds added to every response.
+        jitter (float, optional): Maximum random seconds added on top of `latency`.
+        error_rate (float, optional): Share of requests (0-1) answered with an HTTP 500.
+        upstream (str, optional): Live API root (e.g. 'https://api.census.gov'). Missing
+            recordings are fetched from it and saved to `recordings`.
+        synthesizer (Synthesizer, optional): Generator for requests without a recording. If None
+            and no upstream is set, such requests are answered with an HTTP 404.
+        host (str, optional): Host to bind.
+        port (int, optional): Port to bind; 0 picks a free port.
+        seed (int, optional): Seed for latency jitter and error injection."""
+
+    def __init__(self, recordings=None, latency=0.0, jitter=0.0, error_rate=0.0, upstream=None,
+                 synthesizer=None, host='127.0.0.1', port=0, seed=0):
+        self.recordings = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.synthesizer = synthesizer
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'replayed': 0, 'recorded': 0, 'synthesized': 0, 'errors': 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+        if recordings:
+            os.makedirs(recordings, exist_ok=True)
+
+    @property
+    def baseurl(self):
+        """str: Base URL to use in place of 'https://api.census.gov/data/'."""
+
+        host, port = self.httpd.server_address[:2]
+
+        return 'http://{0}:{1}/data/'.format(host, port)
+
+    def start(self):
+        """Starts serving on a background thread and returns the server's base URL."""
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+        return self.baseurl
+
+    def stop(self):
+        """Stops the server."""
+
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def _delay(self):
+        with self.lock:
+            fail = self.random.random() < self.error_rate
+            delay = self.latency + self.random.uniform(0, self.jitter)
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return fail
+
+    def _fetch(self, path, query):
+        """Returns a (status, body) tuple from recordings, the upstream API, or the synthesizer."""
+
+        key = request_key(path, query)
+
+        if self.recordings:
+            rec = recording_path(self.recordings, key)
+
+            if os.path.exists(rec):
+                with open(rec, encoding='utf-8') as f:
+                    recorded = json.load(f)
+                self._count('replayed')
+                return recorded['status'], recorded['body']
+
+        if self.upstream:
+            try:
+                with urllib.request.urlopen(self.upstream + path + '?' + query) as r:
+                    status, body = r.status, r.read().decode('utf-8')
+            except urllib.error.HTTPError as e:
+                status, body = e.code, e.read().decode('utf-8')
+
+            if self.recordings:
+                with open(recording_path(self.recordings, key), 'w', encoding='utf-8') as f:
+                    json.dump({'request': key, 'status': status, 'body': body}, f)
+            self._count('recorded')
+            return status, body
+
+        if self.synthesizer:
+            self._count('synthesized')
+            return self.synthesizer.respond(path, parse_query(query))
+
+        return 404, 'No recording for ' + key
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                server._count('requests')
+                path, _, query = self.path.partition('?')
+
+                if server._delay():
+                    server._count('errors')
+                    status, body = 500, 'There was an error while running your query.  We\'ve logged the error and we\'ll correct it ASAP.  Sorry for the inconvenience.'
+                else:
+                    status, body = server._fetch(path, query)
+
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json' if status == 200 else 'text/plain')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--recordings', help='folder of recorded responses')
+    parser.add_argument('--record', metavar='UPSTREAM', help='record missing responses from this API root')
+    parser.add_argument('--no-synthesize', action='store_true', help='answer unrecorded requests with 404')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='maximum random extra seconds per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests failing with HTTP 500')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockCensusServer(args.recordings, args.latency, args.jitter, args.error_rate, args.record,
+                              None if args.no_synthesize else Synthesizer(), args.host, args.port, args.seed)
+
+    print('Serving mock Census API at ' + server.baseurl)
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Synthetic Census API responses and data frames for the pipeline benchmarks.
+
+Generated data has the same shape as real downloads: a header row of NAME, GEO_ID, the
+requested variables and the geography columns, followed by one row of strings per block
+group. Values are deterministic for a given seed, so benchmark runs are comparable.
+"""
+
+import random
+
+
+def geographies(rows, tracts_per_county=100, block_groups_per_tract=4):
+    """Returns (state, county, tract, block group) code tuples for `rows` block groups in one state."""
+
+    per_county = tracts_per_county * block_groups_per_tract
+    out = []
+
+    for i in range(rows):
+        county, rest = divmod(i, per_county)
+        tract, bg = divmod(rest, block_groups_per_tract)
+        out.append(('47', '{0:03d}'.format(2 * county + 1), '{0:04d}00'.format(tract + 1), str(bg + 1)))
+
+    return out
+
+
+def variables(cols, table='B99999'):
+    """Returns `cols` estimate variable names."""
+
+    return ['{0}_{1:03d}E'.format(table, i + 1) for i in range(cols)]
+
+
+def response(rows, cols, seed=0, missing=0.001):
+    """Returns a synthetic Census API response for block groups, as returned by `requests.get().json()`.
+
+    Args:
+        rows (int): Number of geographies.
+        cols (int): Number of variables.
+        seed (int, optional): Random seed.
+        missing (float, optional): Share of values returned as null, which is how the API reports
+            suppressed estimates."""
+
+    rng = random.Random(seed)
+    var = variables(cols)
+    data = [['NAME', 'GEO_ID'] + var + ['state', 'county', 'tract', 'block group']]
+
+    for state, county, tract, bg in geographies(rows):
+        name = 'Block Group {0}, Census Tract {1}, C{2} County, Tennessee'.format(bg, int(tract) / 100, county)
+        values = [None if rng.random() < missing else str(rng.randrange(5000)) for i in range(cols)]
+        data.append([name, '1500000US' + state + county + tract + bg] + values + [state, county, tract, bg])
+
+    return data
+
+
+def frame(rows, cols, year, seed=0):
+    """Returns a data frame shaped like the per-year output of `DownloadTable`: a GEOID index, a
+    Geography column, and `<var>_<year>` value columns."""
+
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    geos = geographies(rows)
+    index = pd.Index(['1500000US' + ''.join(g) for g in geos], name='GEOID')
+    data = {v + '_' + str(year): rng.integers(0, 5000, rows) for v in variables(cols)}
+    df = pd.DataFrame(data, index=index)
+    df.insert(0, 'Geography', ['Block Group {0}, Census Tract {1}'.format(g[3], g[2]) for g in geos])
+
+    return df